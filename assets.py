@@ -0,0 +1,230 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pygame
+
+import bundle
+
+SCALE = 'scale'
+SMOOTHSCALE = 'smoothscale'
+
+TRANSFORMS = {
+    SCALE: pygame.transform.scale,
+    SMOOTHSCALE: pygame.transform.smoothscale,
+}
+
+ROTATION_STEP = 1.0  # Degrees rotations are rounded to; lower it (e.g. 0.25) for smoother slow turns
+ROTATION_CACHE_SIZE = 512  # Rotated surfaces kept, about 80 KB each at the default card size
+TINT_CACHE_SIZE = 256  # Highlighted surfaces kept
+TEXT_CACHE_SIZE = 256  # Rendered strings kept
+FLIP_CACHE_SIZE = 32  # Flip animations kept, each about ten cards' worth of pixels
+
+FONT_PATH = 'assets/font.ttf'
+
+# (path, size, transform, tint, blend, converted) -> surface
+_images: dict[tuple, pygame.Surface] = {}
+# path -> surface decoded by preload() and not asked for yet
+_preloaded: dict[str, pygame.Surface] = {}
+_decoded: set[str] = set()  # Paths image() has decoded itself or taken from _preloaded
+_preload_lock = threading.Lock()  # Guards _preloaded and _decoded, shared with the preload thread
+_bundle = None  # The mapped bundle.Bundle once opened, False when there's no usable one
+# (surface, quantized angle) -> rotated surface, least recently used first
+_rotations: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+# (surface, tint, blend) -> tinted surface, least recently used first
+_tints: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+# (surface, steps) -> frames of the flip animation, least recently used first
+_flips: OrderedDict[tuple, list] = OrderedDict()
+# (path, size) -> font
+_fonts: dict[tuple, pygame.font.Font] = {}
+# (font, text, color) -> rendered text, least recently used first
+_texts: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+
+stats = {
+    'hits': 0,
+    'misses': 0,
+    'decodes': 0,
+    'decode_time': 0.0,  # Seconds spent in pygame.image.load and convert_alpha
+    'preloaded': 0,  # Files that preload() had decoded by the time they were needed
+    'unpacked': 0,  # Surfaces built from the bundle instead of a PNG
+    'unpack_time': 0.0,
+    'rotation_hits': 0,
+    'rotation_misses': 0,
+    'tint_hits': 0,
+    'tint_misses': 0,
+    'text_hits': 0,
+    'text_misses': 0,
+    'flip_hits': 0,
+    'flip_misses': 0,
+}
+
+
+def image(path, size=None, transform=SCALE, tint=None, blend=pygame.BLEND_MULT):
+    """Returns a shared surface for the file at `path`, scaled to `size` and filled with `tint`.
+
+    Each file is decoded once and each variant is built once; the surfaces are shared between
+    all callers, so they must not be drawn on - copy them first.
+    """
+    # Surfaces loaded before the window exists can't be converted, so they're cached separately
+    converted = pygame.display.get_surface() is not None
+    key = (path, tuple(size) if size else None, transform, tint, blend if tint else None, converted)
+    surface = _images.get(key)
+    if surface is not None:
+        stats['hits'] += 1
+        return surface
+    stats['misses'] += 1
+
+    if tint is not None:
+        surface = image(path, size, transform).copy()
+        surface.fill(tint, special_flags=blend)
+    elif (bundled := _unpack(path, key[1], transform, converted)) is not None:
+        surface = bundled
+    elif size is not None:
+        surface = TRANSFORMS[transform](image(path), key[1])
+    else:
+        surface = _decode(path, converted)
+    _images[key] = surface
+    return surface
+
+
+def get_bundle():
+    global _bundle
+    if _bundle is None:
+        _bundle = bundle.open_bundle() or False
+    return _bundle
+
+
+def _unpack(path, size, transform, converted):
+    packed = get_bundle()
+    if not packed:
+        return None
+    started = time.perf_counter()
+    surface = packed.surface(path, size, transform)
+    if surface is None:
+        return None
+    # Either way the pixels are copied out of the mapped file
+    surface = surface.convert_alpha() if converted else surface.copy()
+    stats['unpacked'] += 1
+    stats['unpack_time'] += time.perf_counter() - started
+    return surface
+
+
+def preload(paths):
+    """Decodes the files at `paths` in a background thread, so that image() finds them ready.
+
+    Only decoding happens there; converting and scaling stay on the main thread.
+    """
+    packed = get_bundle()
+    with _preload_lock:
+        paths = [path for path in paths
+                 if path not in _preloaded and path not in _decoded and not (packed and packed.covers(path))]
+
+    def decode_all():
+        for path in paths:
+            with _preload_lock:
+                if path in _preloaded or path in _decoded:
+                    continue
+            surface = pygame.image.load(path)
+            # The main thread may have needed the file meanwhile and decoded it itself
+            with _preload_lock:
+                if path not in _decoded:
+                    _preloaded[path] = surface
+
+    thread = threading.Thread(target=decode_all, name='preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def _decode(path, converted):
+    started = time.perf_counter()
+    with _preload_lock:
+        surface = _preloaded.pop(path, None)
+        _decoded.add(path)
+    if surface is not None:
+        stats['preloaded'] += 1
+    else:
+        surface = pygame.image.load(path)
+    if converted:
+        surface = surface.convert_alpha()
+    stats['decodes'] += 1
+    stats['decode_time'] += time.perf_counter() - started
+    return surface
+
+
+def rotated(surface, angle, step=None):
+    """Returns `surface` rotated by `angle` rounded to `step` degrees, shared like image()."""
+    step = step or ROTATION_STEP
+    angle = round(angle / step) * step % 360
+    if not angle:
+        return surface
+    return _lookup(_rotations, (surface, angle), ROTATION_CACHE_SIZE, 'rotation',
+                   lambda: pygame.transform.rotate(surface, angle))
+
+
+def tinted(surface, tint, blend=pygame.BLEND_MULT):
+    """Returns a copy of `surface` filled with `tint`, shared like image()."""
+    def build():
+        result = surface.copy()
+        result.fill(tint, special_flags=blend)
+        return result
+
+    return _lookup(_tints, (surface, tint, blend), TINT_CACHE_SIZE, 'tint', build)
+
+
+def flip_frames(surface, steps):
+    """Frames of a card flip, shared like image(): frame t is `surface` squashed to 1 - t / steps
+    of its width and stretched by 0.2 * t / steps in height, so the last one is edge-on."""
+    def build():
+        w, h = surface.get_size()
+        return [pygame.transform.scale(surface, (w * (1 - t / steps), h * (1 + 0.2 * t / steps)))
+                for t in range(steps + 1)]
+
+    return _lookup(_flips, (surface, steps), FLIP_CACHE_SIZE, 'flip', build)
+
+
+def font(size, path=FONT_PATH):
+    if (path, size) not in _fonts:
+        _fonts[(path, size)] = pygame.font.Font(path, size=size)
+    return _fonts[(path, size)]
+
+
+def text(string, color, size, path=FONT_PATH):
+    """Returns `string` rendered in `color`, shared like image(); None for an empty string."""
+    if not string:
+        return None
+    text_font = font(size, path)
+    return _lookup(_texts, (text_font, string, color), TEXT_CACHE_SIZE, 'text',
+                   lambda: text_font.render(string, True, color).convert_alpha())
+
+
+def _lookup(cache, key, limit, kind, build):
+    result = cache.get(key)
+    if result is not None:
+        stats[kind + '_hits'] += 1
+        cache.move_to_end(key)
+        return result
+    stats[kind + '_misses'] += 1
+
+    result = cache[key] = build()
+    if len(cache) > limit:
+        cache.popitem(last=False)
+    return result
+
+
+def hit_rate(kind):
+    """Share of 'rotation', 'tint', 'text' or 'flip' lookups served from the cache."""
+    lookups = stats[kind + '_hits'] + stats[kind + '_misses']
+    return stats[kind + '_hits'] / lookups if lookups else 0.0
+
+
+def clear():
+    _images.clear()
+    with _preload_lock:
+        _preloaded.clear()
+        _decoded.clear()
+    _rotations.clear()
+    _tints.clear()
+    _texts.clear()
+    _flips.clear()
+    for name in stats:
+        stats[name] = type(stats[name])()
@@ -0,0 +1,210 @@
+"""Rendering benchmark without a window: python -m benchmark --sessions 3 --output bench.json --compare old.json"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from pygame.locals import MOUSEBUTTONUP
+
+import graphics
+from players import Player
+from rules import RANK_J, RANK_JOKER, DISCARD_CARAVAN, PLAY_CARD
+from states import StandardMode
+
+FRAMES = 8000  # Frame limit per session, about 40 turns; a session also ends when the game does
+DISCARD_CARD_SHARE = 0.1  # Share of player 1's turns spent discarding a card
+DISCARD_CARAVAN_SHARE = 0.1  # ... and discarding a caravan
+SPECIAL_SHARE = 0.5  # Chance to play a jack or joker when there is one, for their animations
+CALLS = 20000  # Calls per micro-benchmark
+
+
+class FixedClock:
+    """Stands in for graphics.clock: every frame takes exactly 1 / fps seconds and nothing sleeps,
+    so a seeded session draws the same frames on any machine and at any speed."""
+
+    def __init__(self, fps):
+        self.step = 1000 / fps
+
+    def tick(self, framerate=0):
+        return self.step
+
+    def get_time(self):
+        return self.step
+
+    def get_fps(self):
+        return 1000 / self.step
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)] if values else 0
+
+
+def summary(frame_times):
+    """fps and frame time percentiles of graphics.display, from times in ns."""
+    total = sum(frame_times)
+    return {
+        'frames': len(frame_times),
+        'fps': len(frame_times) / total * 1e9 if total else 0.0,
+        'mean_ms': total / len(frame_times) / 1e6 if frame_times else 0.0,
+        'p50_ms': percentile(frame_times, 50) / 1e6,
+        'p99_ms': percentile(frame_times, 99) / 1e6,
+    }
+
+
+def choose_move(state, player, counts):
+    """Selects a card the way a click would and returns where to click next, or None to pass."""
+    hand = state.objects['player_1_playing_deck']
+    caravans = [state.objects[name] for name in state.caravan_names]
+    possibilities = player.find_possible_moves(hand, caravans)
+    # Player 1 can only put cards on its own caravans, see StandardMode.handle_events
+    plays = [move for move in possibilities[PLAY_CARD] if move[2] in caravans[:3]]
+    if state.player_1_beginning_phase_counter:
+        plays = [move for move in plays if move[0].is_numerical() and not move[2].layers]
+    for card in hand.cards:
+        card.is_selected = False
+
+    roll = random.random()
+    if not state.player_1_beginning_phase_counter:
+        if roll < DISCARD_CARAVAN_SHARE and possibilities[DISCARD_CARAVAN]:
+            caravan = random.choice(possibilities[DISCARD_CARAVAN])
+            caravan.cards[-1].is_selected = True
+            counts['caravan_discards'] += 1
+            return state.objects['trash_button'].rect.center
+        if roll < DISCARD_CARAVAN_SHARE + DISCARD_CARD_SHARE or not plays:
+            random.choice(hand.cards).is_selected = True
+            counts['card_discards'] += 1
+            return state.objects['trash_button'].rect.center
+    if not plays:
+        return None
+
+    specials = [move for move in plays if move[0].rank in (RANK_J, RANK_JOKER)]
+    card, on_top_of_card, caravan = random.choice(specials if specials and random.random() < SPECIAL_SHARE else plays)
+    card.is_selected = True
+    counts['jacks' if card.rank == RANK_J else 'jokers' if card.rank == RANK_JOKER else 'plays'] += 1
+    return on_top_of_card.center
+
+
+def play_session(seed, frames=FRAMES):
+    """Plays one seeded game as player 1 through the real event handling, timing every graphics.display."""
+    random.seed(seed)
+    state = StandardMode()
+    player = Player(player=1)
+    counts = {'plays': 0, 'jacks': 0, 'jokers': 0, 'card_discards': 0, 'caravan_discards': 0}
+    frame_times = []
+    click = None
+    for _ in range(frames):
+        if not isinstance(state, StandardMode):
+            break
+        if click:
+            pygame.event.post(pygame.event.Event(MOUSEBUTTONUP, pos=(int(click[0]), int(click[1])), button=1))
+            click = None
+        elif state.player_1_turn and not state.animation_cooldown:
+            click = choose_move(state, player, counts)
+
+        graphics.handle_events()
+        state = state.handle_events()
+        started = time.perf_counter_ns()
+        graphics.display(state)
+        frame_times.append(time.perf_counter_ns() - started)
+    return state, frame_times, counts
+
+
+def per_call(function, calls=CALLS):
+    """Nanoseconds per call of `function(i)`."""
+    started = time.perf_counter_ns()
+    for i in range(calls):
+        function(i)
+    return (time.perf_counter_ns() - started) / calls
+
+
+def micro_benchmarks(state, calls=CALLS):
+    card = state.objects['player_1_playing_deck'].cards[0]
+    x, y = card.center
+    angles = [-5 + i * 0.5 for i in range(21)]  # The spread of angles cards come to rest at
+    points = [(x + random.uniform(-60, 60), y + random.uniform(-80, 80)) for _ in range(256)]
+    viewport = pygame.Rect(0, 0, graphics.WINDOW_WIDTH, graphics.WINDOW_HEIGHT)
+    results = {
+        'card_set_at_ns': per_call(lambda i: card.set_at(x, y, angles[i % len(angles)]), calls),
+        'card_collides_with_ns': per_call(lambda i: card.collides_with(*points[i % len(points)]), calls),
+        # get_visible_objects sorted every frame; the scene keeps the order, so both its paths are timed
+        'scene_visible_ns': per_call(lambda i: state.objects.visible(viewport), calls),
+        'scene_rebuild_ns': per_call(lambda i: state.objects.rebuild(), calls // 10),
+    }
+    card.set_at(x, y, 0)
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sessions, seed=0, frames=FRAMES, fps=None):
+    pygame.init()
+    graphics.init()
+    graphics.clock = FixedClock(fps or graphics.FPS)
+
+    results = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'sessions': [],
+    }
+    all_times = []
+    state = None
+    for session in range(sessions):
+        state, frame_times, counts = play_session(seed + session, frames)
+        all_times += frame_times
+        results['sessions'].append({'seed': seed + session, 'result': type(state).__name__, **counts, **summary(frame_times)})
+    results['display'] = summary(all_times)
+    results['micro'] = micro_benchmarks(state)
+    return results
+
+
+def compare(results, baseline):
+    """Prints this run next to `baseline`; ratios above 1 are slower for times and faster for fps."""
+    rows = [('display ' + key, baseline['display'][key], results['display'][key]) for key in ('fps', 'p50_ms', 'p99_ms')]
+    rows += [(key, baseline['micro'][key], results['micro'][key]) for key in results['micro'] if key in baseline['micro']]
+    print(f"{'':>24}{baseline.get('commit') or 'baseline':>12}{results.get('commit') or 'current':>12}{'ratio':>8}")
+    for name, old, new in rows:
+        print(f'{name:>24}{old:>12.3f}{new:>12.3f}{new / old if old else 0.0:>8.2f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Times graphics.display over scripted, seeded games without a window.')
+    parser.add_argument('-n', '--sessions', type=int, default=3)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-f', '--frames', type=int, default=FRAMES, help='frame limit per session')
+    parser.add_argument('--fps', type=float, help='frame rate the animations are stepped at, graphics.FPS by default')
+    parser.add_argument('-o', '--output', help='JSON file for the results')
+    parser.add_argument('-c', '--compare', help='JSON file of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    results = run(args.sessions, args.seed, args.frames, args.fps)
+    pygame.quit()
+
+    display = results['display']
+    print(f"{display['frames']} frames, {display['fps']:.0f} FPS, p50 {display['p50_ms']:.2f} ms, p99 {display['p99_ms']:.2f} ms")
+    for name, ns in results['micro'].items():
+        print(f'{name:>24}: {ns:,.0f} ns')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Packed asset bundle: python -m bundle (re)builds assets/bundle.bin from the PNGs.
+
+The bundle holds raw RGBA pixels of every image variant the game asks for, already scaled, so that
+start-up maps one file instead of decoding and scaling dozens of PNGs.
+
+Layout, all little-endian:
+    header    magic b'KRVN', format version (u32), number of entries (u32)
+    index     per entry: ENTRY followed by the utf-8 path of the source PNG
+    pixels    width * height * 4 bytes per entry, at the offset given in its index entry
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+BUNDLE_PATH = 'assets/bundle.bin'
+MAGIC = b'KRVN'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+# path length, width, height, transform, size and mtime of the source PNG, offset of the pixels
+ENTRY = struct.Struct('<HHHBQqQ')
+TRANSFORMS = (None, 'scale', 'smoothscale')  # Index is the transform code; None for the image as decoded
+
+
+class Bundle:
+    """A bundle mapped into memory; surface() builds surfaces straight from the mapped pixels."""
+
+    def __init__(self, path=BUNDLE_PATH):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} asset bundle')
+
+        self.entries = {}  # (path, size, transform) -> (offset of the pixels, source size, source mtime, size)
+        self.sources = {}  # source path -> its size and mtime when the bundle was built
+        position = HEADER.size
+        for _ in range(count):
+            length, width, height, transform, source_size, source_mtime, offset = ENTRY.unpack_from(self.map, position)
+            position += ENTRY.size
+            source = self.map[position:position + length].decode()
+            position += length
+            key = (source, (width, height) if TRANSFORMS[transform] else None, TRANSFORMS[transform])
+            self.entries[key] = (offset, source_size, source_mtime, (width, height))
+            self.sources[source] = (source_size, source_mtime)
+        self.fresh = {}  # source path -> whether the bundled pixels are still up to date
+
+    def is_fresh(self, path, source_size, source_mtime):
+        if path not in self.fresh:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.fresh[path] = True  # Shipped without the PNGs: the bundle is all there is
+            else:
+                self.fresh[path] = (stat.st_size, stat.st_mtime_ns) == (source_size, source_mtime)
+        return self.fresh[path]
+
+    def covers(self, path):
+        """Whether the bundle has up-to-date pixels of the file at `path` in some size."""
+        return path in self.sources and self.is_fresh(path, *self.sources[path])
+
+    def surface(self, path, size=None, transform=None):
+        """A surface with the bundled pixels, or None if they aren't in the bundle or are out of date.
+
+        The surface points into the mapped file; it's only valid to copy or convert.
+        """
+        entry = self.entries.get((path, size, transform if size else None))
+        if entry is None:
+            return None
+        offset, source_size, source_mtime, (width, height) = entry
+        if not self.is_fresh(path, source_size, source_mtime):
+            return None
+        return pygame.image.frombuffer(memoryview(self.map)[offset:offset + width * height * 4], (width, height), 'RGBA')
+
+
+def open_bundle(path=BUNDLE_PATH):
+    """The bundle at `path`, or None if there's none or it's unreadable (the PNGs are used instead)."""
+    try:
+        return Bundle(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def manifest(window_sizes=()):
+    """(path, size, transform) of every variant the game loads; size None means as decoded."""
+    import graphics  # Before states, like main does, as the two import each other
+    import cards
+    import constants
+    import deck_builder
+    import states
+
+    card_size = (cards.CARD_SIZE, cards.CARD_SIZE)
+    thumbnail_size = (int(cards.CARD_SIZE * deck_builder.CARD_SCALE),) * 2
+    faces = [*cards.card_paths.values(), cards.CARD_BACK_PATH]
+    variants = [(path, size, 'scale') for path in faces for size in (card_size, thumbnail_size)]
+    variants += [(path, card_size, 'scale') for path in (cards.EMPTY_OUTLINE_PATH, cards.EMPTY_PATH)]
+    variants += [(graphics.BACKGROUND_PATH, size, 'scale')
+                 for size in dict.fromkeys([(constants.WINDOW_WIDTH, constants.WINDOW_HEIGHT), *window_sizes])]
+    variants += [
+        (deck_builder.EXIT_PATH, (deck_builder.EXIT_BTN_HEIGHT,) * 2, 'scale'),
+        (states.TRASH_PATH, (96, 96), 'scale'),
+        (states.TRASH_OPEN_PATH, (96, 96), 'scale'),
+        # Buttons come in many sizes, so they're scaled at run time from the small original
+        (states.BUTTON_PATH, None, None),
+        # The banners are measured before they're scaled to the window
+        (states.WIN_BANNER_PATH, None, None),
+        (states.LOSE_BANNER_PATH, None, None),
+    ]
+    return variants
+
+
+def rgba(surface):
+    # Whatever the PNG's format, its pixels as 32-bit RGBA, like convert_alpha() gives at run time
+    return pygame.image.frombuffer(pygame.image.tostring(surface, 'RGBA'), surface.get_size(), 'RGBA')
+
+
+def build(path=BUNDLE_PATH, variants=None):
+    import assets
+
+    variants = manifest() if variants is None else variants
+    originals = {}
+    pixels = []
+    for source, size, transform in variants:
+        if source not in originals:
+            originals[source] = rgba(pygame.image.load(source))
+        surface = assets.TRANSFORMS[transform](originals[source], size) if size else originals[source]
+        pixels.append(pygame.image.tostring(surface, 'RGBA'))
+
+    paths = [source.encode() for source, _, _ in variants]
+    offset = HEADER.size + sum(ENTRY.size + len(encoded) for encoded in paths)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(variants)))
+        for (source, size, transform), encoded, data in zip(variants, paths, pixels):
+            stat = os.stat(source)
+            width, height = size or originals[source].get_size()
+            file.write(ENTRY.pack(len(encoded), width, height, TRANSFORMS.index(transform if size else None),
+                                  stat.st_size, stat.st_mtime_ns, offset))
+            file.write(encoded)
+            offset += len(data)
+        for data in pixels:
+            file.write(data)
+    os.replace(path + '.tmp', path)  # A game starting meanwhile never maps a half-written bundle
+    return offset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bundle', description='Packs the game images, pre-scaled, into one file.')
+    parser.add_argument('-o', '--output', default=BUNDLE_PATH)
+    parser.add_argument('-w', '--window-size', action='append', default=[], metavar='WIDTHxHEIGHT',
+                        help='extra window size to pre-scale the background for, e.g. 1280x800; can be repeated')
+    args = parser.parse_args(argv)
+
+    window_sizes = [tuple(int(side) for side in size.lower().split('x')) for size in args.window_size]
+    variants = manifest(window_sizes)
+    size = build(args.output, variants)
+    print(f'{args.output}: {len(variants)} images, {size / 2 ** 20:.1f} MB')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
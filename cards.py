@@ -1,87 +1,106 @@
 import math
+from typing import NamedTuple
 
 import pygame
 
+import assets
+from scene import Drawable
+from rules import (
+    RANK_A, RANK_2, RANK_3, RANK_4, RANK_5, RANK_6, RANK_7, RANK_8, RANK_9, RANK_10, RANK_J, RANK_Q, RANK_K, RANK_JOKER,
+    SUIT_SPADES, SUIT_HEARTS, SUIT_DIAMONDS, SUIT_CLUBS, SUIT_BLACK_JOKER, SUIT_RED_JOKER, RANKS, SUITS, card_id
+)
 
-RANK_A = 1
-RANK_2 = 2
-RANK_3 = 3
-RANK_4 = 4
-RANK_5 = 5
-RANK_6 = 6
-RANK_7 = 7
-RANK_8 = 8
-RANK_9 = 9
-RANK_10 = 10
-RANK_J = 11
-RANK_Q = 12
-RANK_K = 13
-RANK_JOKER = 14
-
-SUIT_SPADES = 1
-SUIT_HEARTS = 2
-SUIT_DIAMONDS = 3
-SUIT_CLUBS = 4
-SUIT_BLACK_JOKER = 5
-SUIT_RED_JOKER = 6
-
-RANKS = [RANK_A, RANK_2, RANK_3, RANK_4, RANK_5, RANK_6, RANK_7, RANK_8, RANK_9, RANK_10, RANK_J, RANK_Q, RANK_K, RANK_JOKER]
 RANK_NAMES = ['A', '02', '03', '04', '05', '06', '07', '08', '09', '10', 'J', 'Q', 'K', 'joker']
-
-SUITS = [SUIT_SPADES, SUIT_HEARTS, SUIT_DIAMONDS, SUIT_CLUBS, SUIT_BLACK_JOKER, SUIT_RED_JOKER]
 SUIT_NAMES = ['spades', 'hearts', 'diamonds', 'clubs', 'black', 'red']
 
 CARD_SIZE = 128
+CARD_BACK_PATH = 'assets/cards/card_back.png'
+EMPTY_OUTLINE_PATH = 'assets/cards/card_empty_outline.png'
+EMPTY_PATH = 'assets/cards/card_empty.png'
+
+HOVER_TINT = (255, 255, 0, 255)
+CLICK_TINT = (0, 255, 0, 255)
 
-card_images = {}
+card_paths = {}
 for rank, rank_name in zip(RANKS, RANK_NAMES):
     if rank == RANK_JOKER:
-        card_images[(RANK_JOKER, SUIT_BLACK_JOKER)] = pygame.image.load('assets/cards/card_black_joker_alt.png')
-        card_images[(RANK_JOKER, SUIT_RED_JOKER)] = pygame.image.load('assets/cards/card_red_joker_alt.png')
+        card_paths[(RANK_JOKER, SUIT_BLACK_JOKER)] = 'assets/cards/card_black_joker_alt.png'
+        card_paths[(RANK_JOKER, SUIT_RED_JOKER)] = 'assets/cards/card_red_joker_alt.png'
         continue
     for suit, suit_name in zip(SUITS[:-2], SUIT_NAMES[:-2]):
-        card_images[(rank, suit)] = pygame.image.load(f'assets/cards/card_{suit_name}_{rank_name}.png')
+        card_paths[(rank, suit)] = f'assets/cards/card_{suit_name}_{rank_name}.png'
 
-for card in card_images:
-    card_images[card] = pygame.transform.scale(card_images[card], (CARD_SIZE, CARD_SIZE))
 
+class CardValue(NamedTuple):
+    """What a card is, as opposed to where it lies: one shared instance per kind of card, see card_value()."""
+    rank: int
+    suit: int
+    id: int
+    path: str
 
-class Card:
-    def __init__(self, rank, suit):
-        self.rank: int = rank
-        self.suit: int = suit
-        self.original_image = card_images[(self.rank, self.suit)].convert_alpha()
-        self.original_back_image = pygame.image.load('assets/cards/card_back.png').convert_alpha()
-        self.original_back_image = pygame.transform.scale(self.original_back_image, (CARD_SIZE, CARD_SIZE))
-        self.image = card_images[(self.rank, self.suit)].convert_alpha()
 
-        self.back_image = self.original_back_image.copy()
+card_values: dict[tuple[int, int], CardValue] = {}
 
-        self.hovered_image = self.image.copy()
-        self.hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
 
-        self.clicked_image = self.image.copy()
-        self.clicked_image.fill((0, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+def card_value(rank, suit):
+    value = card_values.get((rank, suit))
+    if value is None:
+        value = card_values[(rank, suit)] = CardValue(rank, suit, card_id(rank, suit), card_paths[(rank, suit)])
+    return value
 
-        self.rect = self.image.get_rect()
-        self.center = self.rect.center
 
-        self.top_left = (int(23 * CARD_SIZE / 128) - CARD_SIZE // 2, int(4 * CARD_SIZE / 128) - CARD_SIZE // 2)
-        self.top_right = (int(106 * CARD_SIZE / 128) - CARD_SIZE // 2, int(4 * CARD_SIZE / 128) - CARD_SIZE // 2)
-        self.bottom_left = (int(23 * CARD_SIZE / 128) - CARD_SIZE // 2, int(124 * CARD_SIZE / 128) - CARD_SIZE // 2)
-        self.bottom_right = (int(106 * CARD_SIZE / 128) - CARD_SIZE // 2, int(124 * CARD_SIZE / 128) - CARD_SIZE // 2)
+class Card(Drawable):
+    """A card on the table: its shared CardValue plus where and how it's drawn.
 
+    Cards are created by the hundred (four decks per game and the deck builder's pool), so they use
+    __slots__ and only point to surfaces shared through assets.
+    """
+    __slots__ = ('value', 'original_image', 'original_back_image', 'image', 'back_image', 'rect', 'center', 'angle',
+                 'size', 'polygon', 'is_visible', 'is_hoverable', 'is_hovered', 'is_selected', 'is_flipped', 'scene', '_z_index')
+
+    # Corners of the card face around its center, before rotation, for a card CARD_SIZE pixels wide
+    CORNERS = (
+        (int(23 * CARD_SIZE / 128) - CARD_SIZE // 2, int(4 * CARD_SIZE / 128) - CARD_SIZE // 2),
+        (int(106 * CARD_SIZE / 128) - CARD_SIZE // 2, int(4 * CARD_SIZE / 128) - CARD_SIZE // 2),
+        (int(106 * CARD_SIZE / 128) - CARD_SIZE // 2, int(124 * CARD_SIZE / 128) - CARD_SIZE // 2),
+        (int(23 * CARD_SIZE / 128) - CARD_SIZE // 2, int(124 * CARD_SIZE / 128) - CARD_SIZE // 2),
+    )
+    text = ''
+    font_color = (0, 0, 0, 0)
+
+    def __init__(self, rank, suit):
+        self.value = card_value(rank, suit)
+        self.original_image = assets.image(self.value.path, (CARD_SIZE, CARD_SIZE))
+        self.original_back_image = assets.image(CARD_BACK_PATH, (CARD_SIZE, CARD_SIZE))
+        self.image = self.original_image
+        self.back_image = self.original_back_image
+
+        self.rect = self.image.get_rect()
+        self.center = self.rect.center
         self.angle = 0
+        self.size = CARD_SIZE
+        self.polygon = None  # Corners after rotation, computed on the first hit test after a move
 
         self.is_visible = True
         self.is_hoverable = True
         self.is_hovered = False
         self.is_selected = False
         self.is_flipped = False
-        self.is_flipping = False
+        self.scene = None
+        self._z_index = 0
         self.z_index = 10
-        self.text = ''
-        self.font_color = (0, 0, 0, 0)
+
+    @property
+    def rank(self):
+        return self.value.rank
+
+    @property
+    def suit(self):
+        return self.value.suit
+
+    @property
+    def id(self):
+        return self.value.id
 
     def is_numerical(self):
         return RANK_A <= self.rank <= RANK_10
@@ -106,42 +125,39 @@ class Card:
             self.is_selected = False
 
     def get_hovered_params(self):
-        self.hovered_image = self.image.copy()
-        self.hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
-
-        hovered_image = self.hovered_image
-        if not self.is_flipped:
-            hovered_image = self.back_image.copy()
-            hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+        hovered_image = assets.tinted(self.get_image(), HOVER_TINT)
         return hovered_image, self.rect, hovered_image, self.rect, self.text
 
     def get_clicked_params(self):
-        self.clicked_image = self.image.copy()
-        self.clicked_image.fill((0, 255, 0, 255), special_flags=pygame.BLEND_MULT)
-
-        clicked_image = self.clicked_image
-        if not self.is_flipped:
-            clicked_image = self.back_image.copy()
-            clicked_image.fill((0, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+        clicked_image = assets.tinted(self.get_image(), CLICK_TINT)
         return clicked_image, self.rect, clicked_image, self.rect, self.text
 
-    def set_at(self, center_x, center_y, angle):
-        self.image = pygame.transform.rotate(self.original_image, angle)
-        self.back_image = pygame.transform.rotate(self.original_back_image, angle)
+    def set_at(self, center_x, center_y, angle, size=None):
+        """Places the card; with `size` it's drawn and hit-tested that many pixels wide from then on."""
+        if size is not None and size != self.size:
+            self.original_image = assets.image(self.value.path, (size, size))
+            self.original_back_image = assets.image(CARD_BACK_PATH, (size, size))
+            self.size = size
+        self.image = assets.rotated(self.original_image, angle)
+        self.back_image = assets.rotated(self.original_back_image, angle)
         self.rect = self.image.get_rect()
         self.rect.center = center_x, center_y
         self.center = center_x, center_y
         self.angle = angle
+        self.polygon = None
+        self.moved()
 
     def collides_with(self, x, y):
         if not self.rect.collidepoint(x, y):
             return False
 
-        vertices = [self.top_left, self.top_right, self.bottom_right, self.bottom_left]
-        radians = math.radians(self.angle)
-        sin, cos = math.sin(radians), math.cos(radians)
-        vxs = [cx * cos + cy * sin + self.center[0] for cx, cy in vertices]
-        vys = [-cx * sin + cy * cos + self.center[1] for cx, cy in vertices]
+        if self.polygon is None:
+            radians = math.radians(self.angle)
+            scale = self.size / CARD_SIZE
+            sin, cos = math.sin(radians) * scale, math.cos(radians) * scale
+            self.polygon = ([cx * cos + cy * sin + self.center[0] for cx, cy in self.CORNERS],
+                            [-cx * sin + cy * cos + self.center[1] for cx, cy in self.CORNERS])
+        vxs, vys = self.polygon
 
         is_inside = False
         j = len(vxs) - 1
@@ -162,12 +178,6 @@ class Card:
         else:
             self.back_image = image
 
-        self.hovered_image = self.get_image().copy()
-        self.hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
-
-        self.clicked_image = self.get_image().copy()
-        self.clicked_image.fill((0, 255, 0, 255), special_flags=pygame.BLEND_MULT)
-
     def dump(self):
         return [self]
 
@@ -182,31 +192,32 @@ class Card:
 
 
 class PlaceholderCard(Card):
+    __slots__ = ('original_hovered_image', 'hovered_image')
+
     def __init__(self):
         super().__init__(RANK_A, SUIT_CLUBS)
-        self.original_back_image = pygame.image.load('assets/cards/card_empty_outline.png').convert_alpha()
-        self.original_back_image = pygame.transform.scale(self.original_back_image, (CARD_SIZE, CARD_SIZE))
-
-        self.back_image = self.original_back_image.copy()
+        self.original_back_image = assets.image(EMPTY_OUTLINE_PATH, (CARD_SIZE, CARD_SIZE))
 
-        self.original_hovered_image = pygame.image.load('assets/cards/card_empty.png').convert_alpha()
-        self.hovered_image = self.original_hovered_image.copy()
-        self.hovered_image = pygame.transform.scale(self.hovered_image, (CARD_SIZE, CARD_SIZE))
-        self.hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+        self.back_image = self.original_back_image
 
-        self.clicked_image = self.image.copy()
-        self.clicked_image.fill((0, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+        self.original_hovered_image = assets.tinted(assets.image(EMPTY_PATH, (CARD_SIZE, CARD_SIZE)), HOVER_TINT)
+        self.hovered_image = self.original_hovered_image
 
     def get_hovered_params(self):
         return self.hovered_image, self.rect, self.hovered_image, self.rect, self.text
 
-    def set_at(self, center_x, center_y, angle):
-        self.image = pygame.transform.rotate(self.original_image, angle)
-        self.back_image = pygame.transform.rotate(self.original_back_image, angle)
-        self.hovered_image = pygame.transform.scale(self.original_hovered_image, (CARD_SIZE, CARD_SIZE))
-        self.hovered_image = pygame.transform.rotate(self.hovered_image, angle)
-        self.hovered_image.fill((255, 255, 0, 255), special_flags=pygame.BLEND_MULT)
+    def set_at(self, center_x, center_y, angle, size=None):
+        if size is not None and size != self.size:
+            self.original_image = assets.image(self.value.path, (size, size))
+            self.original_back_image = assets.image(EMPTY_OUTLINE_PATH, (size, size))
+            self.original_hovered_image = assets.tinted(assets.image(EMPTY_PATH, (size, size)), HOVER_TINT)
+            self.size = size
+        self.image = assets.rotated(self.original_image, angle)
+        self.back_image = assets.rotated(self.original_back_image, angle)
+        self.hovered_image = assets.rotated(self.original_hovered_image, angle)
         self.rect = self.image.get_rect()
         self.rect.center = center_x, center_y
         self.center = center_x, center_y
         self.angle = angle
+        self.polygon = None
+        self.moved()
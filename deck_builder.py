@@ -1,9 +1,10 @@
 import pygame
+import assets
 from pygame.locals import MOUSEBUTTONUP
 from states import State, Button, Quit
 from decks import generate_all_cards
 from cards import CARD_SIZE
-import random, math
+import random, math, threading
 from graphics import WINDOW_WIDTH, WINDOW_HEIGHT
 
 POOL_SIZE = 40
@@ -20,14 +21,16 @@ CONFIRM_HEIGHT = 70
 EXIT_BTN_WIDTH = 150
 EXIT_BTN_HEIGHT = 50
 MAIN_EXIT_BTN_SIZE = 150
+EXIT_PATH = 'assets/images/exit.png'
+
+AUTO_PICK_BUDGET = 3.0  # Секунды на подбор колоды симуляциями
 
 class MainMenuState(State):
     def __init__(self):
         super().__init__()
-        exit_img = pygame.image.load('assets/images/exit.png').convert_alpha()
-        exit_img = pygame.transform.scale(exit_img, (EXIT_BTN_HEIGHT, EXIT_BTN_HEIGHT))
-        exit_hover = exit_img.copy()
-        exit_hover.fill((255, 255, 255, 100), special_flags=pygame.BLEND_RGBA_ADD)
+        exit_size = (EXIT_BTN_HEIGHT, EXIT_BTN_HEIGHT)
+        exit_img = assets.image(EXIT_PATH, exit_size)
+        exit_hover = assets.image(EXIT_PATH, exit_size, tint=(255, 255, 255, 100), blend=pygame.BLEND_RGBA_ADD)
         self.exit_main_btn = Button(
             WINDOW_WIDTH - EXIT_BTN_HEIGHT - 100,
             60,
@@ -103,13 +106,9 @@ class DeckBuildingState(State):
             row = idx // COLS
             cx = margin_x + col * spacing_x + scaled_w // 2
             cy = margin_y + row * spacing_y + scaled_h // 2
-            card.set_at(cx, cy, 0)
+            card.set_at(cx, cy, 0, size=scaled_w)
             card.is_flipped = True
             card.z_index = 10
-            card.image = pygame.transform.scale(card.image, (scaled_w, scaled_h))
-            card.back_image = pygame.transform.scale(card.back_image, (scaled_w, scaled_h))
-            card.rect = card.image.get_rect(center=(cx, cy))
-            card.center = (cx, cy)
             self.objects[f'card_{idx}'] = card
             hl_surf = pygame.Surface((scaled_w, scaled_h), pygame.SRCALPHA)
             hl_surf.fill((0, 255, 0, 100))
@@ -154,6 +153,17 @@ class DeckBuildingState(State):
         )
         self.objects['confirm'] = self.confirm
 
+        self.auto_pick = Button(
+            WINDOW_WIDTH - 2 * CONFIRM_WIDTH - 40,
+            WINDOW_HEIGHT - CONFIRM_HEIGHT - 20,
+            CONFIRM_WIDTH,
+            CONFIRM_HEIGHT,
+            text='Автовыбор',
+            is_clickable=True,
+            z_index=1000
+        )
+        self.objects['auto_pick'] = self.auto_pick
+
         self.exit_btn = Button(
             20,
             WINDOW_HEIGHT - EXIT_BTN_HEIGHT - 20,
@@ -166,31 +176,58 @@ class DeckBuildingState(State):
         self.objects['exit_btn'] = self.exit_btn
 
         self.selected = set()
+        self.picking = None  # Поток автовыбора, пока он считает
+        self.picked = None  # Колода, которую он подобрал
 
     def handle_events(self):
+        if self.picking is not None and not self.picking.is_alive():
+            self.picking = None
+            if self.picked is not None:
+                self.selected = {self.index_of[card] for card in self.picked}
+            self.update_selection()
         for event in pygame.event.get(MOUSEBUTTONUP):
             x, y = event.pos
             if self.exit_btn.collides_with(x, y):
                 from deck_builder import MainMenuState
                 return MainMenuState()
+            if self.picking is not None:
+                continue  # Пока идёт автовыбор, выбор карт не меняется
             # Выбор и подсветка карт
             for key, obj in list(self.objects.items()):
                 if key.startswith('card_') and obj.collides_with(x, y):
                     idx = int(key.split('_')[1])
                     if idx in self.selected:
                         self.selected.remove(idx)
-                        obj.is_selected = False
                     elif len(self.selected) < START_DECK_SIZE:
                         self.selected.add(idx)
-                        obj.is_selected = True
-                    self.info.text = f"Выбрано {len(self.selected)}/{START_DECK_SIZE}"
-                    for i in range(len(self.pool)):
-                        self.objects[f'highlight_{i}'].is_visible = (i in self.selected)
+                    self.update_selection()
+            if self.auto_pick.collides_with(x, y):
+                self.pick_deck()
             if self.confirm.collides_with(x, y) and len(self.selected) == START_DECK_SIZE:
                 from states import StandardMode
                 chosen = [self.pool[i] for i in sorted(self.selected)]
                 return StandardMode(starting_cards=chosen)
         return self
 
+    def update_selection(self):
+        for i, card in enumerate(self.pool):
+            card.is_selected = i in self.selected
+            self.objects[f'highlight_{i}'].is_visible = card.is_selected
+        self.info.text = f"Выбрано {len(self.selected)}/{START_DECK_SIZE}"
+
+    def pick_deck(self):
+        # Подбирает колоду из пула симуляциями, начиная с уже выбранных карт.
+        # Симуляции идут в фоновом потоке, окно тем временем отзывается; результат забирает handle_events
+        from deck_optimizer import DeckOptimizer
+        self.index_of = {card.id: i for i, card in enumerate(self.pool)}
+        start = [self.pool[i].id for i in self.selected]
+        optimizer = DeckOptimizer([card.id for card in self.pool], START_DECK_SIZE, time_budget=AUTO_PICK_BUDGET)
+
+        def pick():
+            self.picked = optimizer.optimize(start=start)
+        self.picking = threading.Thread(target=pick, daemon=True)
+        self.picking.start()
+        self.info.text = "Подбираем колоду..."
+
     def is_running(self):
         return True
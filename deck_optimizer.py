@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from players import RandomPlayer
+from rules import IS_NUMERICAL, OPENING_MOVES
+from simulate import play_game, wilson_interval, MAX_MOVES
+
+BATCH_GAMES = 40  # Games per submitted task
+MAX_GAMES = 400  # Games after which a deck's win rate counts as settled
+STEP_GAMES = 2 * BATCH_GAMES  # Games a deck gets per step at most, so a step fits in a fraction of the budget
+NEIGHBOURS = 6  # Candidates raced against the current deck per step
+# Workers are started fresh instead of forked: the optimizer may run in a thread of the game, which holds a window
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def deck_key(deck):
+    # Order doesn't matter for a deck, so the sorted ids are its canonical key
+    return tuple(sorted(deck))
+
+
+def deck_wins(deck, player, opponent, seed, games, max_moves=MAX_MOVES):
+    """Worker task: how many of `games` `player` wins as player 1 with `deck` against `opponent`."""
+    return sum(play_game(player, opponent, seed, game, max_moves, decks=(list(deck), None)).winner == 1
+               for game in games)
+
+
+def is_playable(deck):
+    return sum(1 for card in deck if IS_NUMERICAL[card]) >= OPENING_MOVES
+
+
+class DeckOptimizer:
+    """Local search for the best `deck_size` cards of `pool`, scored by simulated win rate.
+
+    Every deck plays the same seeded games (common random numbers), so differences between decks
+    aren't drowned in deal noise. Candidates are raced in batches across a process pool and dropped
+    as soon as their Wilson upper bound falls below the best lower bound. Results are cached by
+    deck_key, so a deck the search walks back to isn't simulated again.
+    """
+
+    def __init__(self, pool, deck_size=30, player=RandomPlayer, opponent=RandomPlayer, time_budget=3.0, workers=None, seed=0):
+        self.pool = list(pool)
+        self.deck_size = deck_size
+        self.player = player  # Who plays the deck in the simulations
+        self.opponent = opponent
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count()
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.results: dict[tuple, list] = {}  # deck key -> [wins, games], finished games only
+        self.scheduled: dict[tuple, int] = {}  # deck key -> games handed out, so every batch gets new seeds
+        self.deadline = 0.0
+        self.steps = 0  # Races against neighbours run by the last optimize()
+
+    def optimize(self, start=None):
+        self.deadline = time.perf_counter() + self.time_budget
+        self.steps = 0
+        current = self.random_deck(start or ())
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)) as executor:
+            self.race(executor, [current])
+            while time.perf_counter() < self.deadline:
+                candidates = [current] + [self.neighbour(current) for _ in range(NEIGHBOURS)]
+                current = self.race(executor, candidates)
+                self.steps += 1
+        return list(current)
+
+    def win_rate(self, deck):
+        wins, games = self.results.get(deck_key(deck), (0, 0))
+        return wins / games if games else 0.0
+
+    def random_deck(self, start=()):
+        # Fills up the partial deck `start` with random cards of the pool
+        start = list(start)[:self.deck_size]
+        while True:
+            rest = [card for card in self.pool if card not in start]
+            deck = deck_key(start + self.rng.sample(rest, self.deck_size - len(start)))
+            if is_playable(deck):
+                return deck
+            start = []  # The chosen cards can't open a game, start over from scratch
+
+    def neighbour(self, deck):
+        # Swap one card of the deck for one left in the pool
+        rest = [card for card in self.pool if card not in deck]
+        while True:
+            out, into = self.rng.choice(deck), self.rng.choice(rest)
+            candidate = deck_key([card for card in deck if card != out] + [into])
+            if is_playable(candidate):
+                return candidate
+
+    def bounds(self, deck):
+        wins, games = self.results.get(deck, (0, 0))
+        return wilson_interval(wins, games)
+
+    def race(self, executor, candidates):
+        """Simulates the candidates in batches until one is left, each has had STEP_GAMES more games
+        (up to MAX_GAMES) or time runs out; returns the best. Decks that stay in the search, like the
+        current one, keep their games from earlier races and so settle over several steps."""
+        candidates = list(dict.fromkeys(candidates))
+        for deck in candidates:
+            self.results.setdefault(deck, [0, 0])
+            self.scheduled.setdefault(deck, self.results[deck][1])
+        limit = {deck: min(MAX_GAMES, self.results[deck][1] + STEP_GAMES) for deck in candidates}
+        alive = set(candidates)
+        pending = {}  # future -> deck, at most one batch per deck
+        while alive and time.perf_counter() < self.deadline:
+            running = set(pending.values())
+            for deck in alive:
+                if deck not in running and self.scheduled[deck] < limit[deck]:
+                    games = range(self.scheduled[deck], self.scheduled[deck] + BATCH_GAMES)
+                    self.scheduled[deck] += BATCH_GAMES
+                    pending[executor.submit(deck_wins, deck, self.player, self.opponent, self.seed, games)] = deck
+            if not pending:
+                break
+            done, _ = wait(pending, timeout=max(0.0, self.deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+            for future in done:
+                result = self.results[pending.pop(future)]
+                result[0] += future.result()
+                result[1] += BATCH_GAMES
+
+            # Early stopping: drop decks that are clearly worse than the best one so far.
+            # A deck with a batch under way isn't judged until it's back.
+            running = set(pending.values())
+            best_lower = max(self.bounds(deck)[0] for deck in alive)
+            alive = {deck for deck in alive if deck in running or self.bounds(deck)[1] >= best_lower}
+            if len(alive) == 1 and not pending:
+                break
+
+        for future in pending:
+            future.cancel()  # Unfinished batches don't count, their seeds are handed out again
+        for deck in candidates:
+            self.scheduled[deck] = self.results[deck][1]
+            if not self.results[deck][1]:
+                del self.results[deck], self.scheduled[deck]
+        scored = [deck for deck in candidates if deck in self.results]
+        return max(scored, key=lambda deck: (self.bounds(deck)[0], self.win_rate(deck))) if scored else candidates[0]
@@ -1,33 +1,58 @@
 from cards import *
 from constants import WINDOW_WIDTH, WINDOW_HEIGHT
-import numpy as np
+from rules import DESC, UNDEFINED, ASC, MIN_CARAVAN_THRESHOLD, MAX_CARAVAN_THRESHOLD, CaravanState
+from collections import deque
+from itertools import islice
+import rules
+import math
 import random
 
-DESC = -1
-UNDEFINED = 0
-ASC = 1
-
-MIN_CARAVAN_THRESHOLD = 21
-MAX_CARAVAN_THRESHOLD = 26
-
 
 class Deck:
     def __init__(self, cards):
         self.cards: list[Card] = cards
+        self.version = 0  # Bumped whenever self.cards changes, so the Scene knows to re-index it
+        # Card -> its number; a card's position in self.cards is its number minus self.first,
+        # so taking the bottom card only moves self.first instead of renumbering the rest
+        self.index: dict[Card, int] = {}
+        self.first = 0
+        self.reindex()
 
         self.is_hoverable = True
 
+    def reindex(self):
+        self.first = 0
+        self.index = {card: i for i, card in enumerate(self.cards)}
+
+    def position(self, card):
+        return self.index[card] - self.first
+
     def add_card(self, card):
         if self.cards:
             card.z_index = max(self.cards[-1].z_index + 1, card.z_index)
+        self.index[card] = self.first + len(self.cards)
         self.cards.append(card)
+        self.version += 1
 
     def contains(self, card):
-        return any(card == s_card for s_card in self.cards)
+        return card in self.index
 
     def remove_card(self, card):
-        if self.contains(card):
-            self.cards.remove(card)
+        if (number := self.index.pop(card, None)) is None:
+            return
+        i = number - self.first
+        del self.cards[i]
+        if i == 0:
+            self.first += 1
+        else:
+            for moved in islice(self.cards, i, None):
+                self.index[moved] -= 1
+        self.version += 1
+
+    def replace_cards(self, cards):
+        self.cards = cards
+        self.reindex()
+        self.version += 1
 
     def hover(self, x, y):
         for card in self.cards:
@@ -37,12 +62,18 @@ class Deck:
         for reset_card in self.cards:
             reset_card.is_selected = False
 
-        z_cards = sort_cards_by_z_index(self.cards)
-        for card in z_cards:
-            if card.collides_with(x, y) and card.is_hoverable:
+        for card in self.cards_at(x, y):
+            if card.is_hoverable:
                 card.click(x, y)
                 break
 
+    def cards_at(self, x, y):
+        """Cards of the deck under the point, topmost first."""
+        scene = self.cards[0].scene if self.cards else None
+        if scene is None:
+            return [card for card in sort_cards_by_z_index(self.cards) if card.collides_with(x, y)]
+        return [card for card in scene.at(x, y) if card in self.index]
+
     def check_if_selected(self):
         return any(card.is_selected for card in self.cards)
 
@@ -75,21 +106,26 @@ class PlayingDeck(Deck):
         super().add_card(card)
         card.is_hoverable = True
 
-    def respace_cards_positions(self):
-        if self.player == 1:
-            return generate_player_1_hand_card_positions(len(self.cards))
-        if self.player == 2:
-            return generate_player_2_hand_card_positions(len(self.cards))
-
 
 class DrawingDeck(Deck):
     def __init__(self, cards=None):
         if not cards:
             cards = generate_drawing_deck_1_cards(30)
-        super().__init__(cards)
+        super().__init__(deque(cards))
 
         self.is_selected = False
 
+    def replace_cards(self, cards):
+        super().replace_cards(deque(cards))
+
+    def draw(self):
+        """Takes the top card of the deck."""
+        card = self.cards.popleft()
+        del self.index[card]
+        self.first += 1
+        self.version += 1
+        return card
+
 
 def generate_all_cards():
     return ([Card(rank, suit) for rank in RANKS[:-1] for suit in SUITS[:-2]] +
@@ -139,28 +175,39 @@ def generate_player_2_hand_cards(num_cards: int = 5, cards=None):
     return res
 
 
+def linspace(start, stop, num):
+    # num evenly spaced numbers from start to stop inclusive, num >= 2
+    return [start + (stop - start) * i / (num - 1) for i in range(num)]
+
+
 def generate_player_1_hand_card_positions(num_cards: int = 5):
     if num_cards == 0:
         return []
     if num_cards == 1:
         return [(WINDOW_WIDTH - 50, WINDOW_HEIGHT - 175, 0)]
-    x_coords = list(np.linspace(WINDOW_WIDTH - 250, WINDOW_WIDTH - 50, num_cards))
-    unit_x_coords = list(np.linspace(25, 225, num_cards))
-    unit_y_coords = list(map(lambda x: -np.sqrt(150 ** 2 * (1 - 1 / (225 ** 2) * (x - 225) ** 2)), unit_x_coords))
+    x_coords = linspace(WINDOW_WIDTH - 250, WINDOW_WIDTH - 50, num_cards)
+    unit_x_coords = linspace(25, 225, num_cards)
+    unit_y_coords = list(map(lambda x: -math.sqrt(150 ** 2 * (1 - 1 / (225 ** 2) * (x - 225) ** 2)), unit_x_coords))
     offset_x, offset_y = WINDOW_WIDTH - 50 - unit_x_coords[-1], WINDOW_HEIGHT - 175 - unit_y_coords[-1]
     y_coords = list(map(lambda y: y + offset_y, unit_y_coords))
     angles = [40 * (num_cards - 1 - i) / (num_cards - 1) for i in range(num_cards)]
     return list(zip(x_coords, y_coords, angles))
 
 
+def generate_hand_card_positions(player: int, num_cards: int = 5):
+    if player == 1:
+        return generate_player_1_hand_card_positions(num_cards)
+    return generate_player_2_hand_card_positions(num_cards)
+
+
 def generate_player_2_hand_card_positions(num_cards: int = 5):
     if num_cards == 0:
         return []
     if num_cards == 1:
         return [(WINDOW_WIDTH - 50, 175, 0)]
-    x_coords = list(np.linspace(WINDOW_WIDTH - 250, WINDOW_WIDTH - 50, num_cards))
-    unit_x_coords = list(np.linspace(25, 225, num_cards))
-    unit_y_coords = list(map(lambda x: -np.sqrt(150 ** 2 * (1 + 1 / (225 ** 2) * (x - 225) ** 2)), unit_x_coords))
+    x_coords = linspace(WINDOW_WIDTH - 250, WINDOW_WIDTH - 50, num_cards)
+    unit_x_coords = linspace(25, 225, num_cards)
+    unit_y_coords = list(map(lambda x: -math.sqrt(150 ** 2 * (1 + 1 / (225 ** 2) * (x - 225) ** 2)), unit_x_coords))
     offset_x, offset_y = WINDOW_WIDTH - 50 - unit_x_coords[-1], 175 - unit_y_coords[-1]
     y_coords = list(map(lambda y: y + offset_y - 25, unit_y_coords))
     angles = [-40 * (num_cards - 1 - i) / (num_cards - 1) for i in range(num_cards)]
@@ -195,36 +242,29 @@ class Caravan(Deck):
         self.player = player
         self.caravan = caravan
         self.layers: list[list[Card, list[Card]]] = []
-        self.value = 0
-        self.suit = UNDEFINED
-        self.direction = UNDEFINED
+        # Same layers as card ids, the rules work on these; the index is the caravan's place among the six
+        self.state = CaravanState(index=(player - 1) * 3 + 'ABC'.index(caravan))
+        self.layer_of: dict[Card, int] = {}  # Index of the layer each card in self.layers belongs to
 
-    def calculate_value(self):
-        return sum([card.rank * 2 ** len([card for card in adjacents if card.rank == RANK_K]) for card, adjacents in self.layers])
+    # Value, suit and direction are kept up to date by the rules as cards come and go
+    @property
+    def value(self):
+        return self.state.value
 
-    def calculate_suit(self):
-        if not self.layers:
-            return UNDEFINED
-        card, adjacents = self.layers[-1]
-        suit = card.suit
-        for adj in adjacents:
-            if adj.rank == RANK_Q:
-                suit = adj.suit
-        return suit
-
-    def calculate_direction(self):
-        if len(self.layers) <= 1:
-            return UNDEFINED
-        card_1 = self.layers[-2][0]
-        card_2, adjacents = self.layers[-1]
-        if card_1.rank >= card_2.rank:
-            direction = DESC  # Yes, if the last two cards have the same rank, FNV considers the caravan as decreasing
-        else:
-            direction = ASC
-        for adj in adjacents:
-            if adj.rank == RANK_Q:
-                direction *= -1
-        return direction
+    @property
+    def suit(self):
+        return self.state.suit
+
+    @property
+    def direction(self):
+        return self.state.direction
+
+    @property
+    def is_sold(self):
+        return self.state.is_sold
+
+    def find_layer(self, card: Card):
+        return self.layer_of.get(card)
 
     def add_card_on(self, card: Card, on_top_of_card: Card):
         if not self.layers:
@@ -234,43 +274,22 @@ class Caravan(Deck):
         else:
             self.cards[0].is_visible = False
 
+        self.index[card] = self.first + len(self.cards)
         self.cards.append(card)
+        self.version += 1
 
+        layer = self.find_layer(on_top_of_card)
         if card.is_numerical():
             self.layers.append([card, []])
-            self.value += card.rank
+            self.layer_of[card] = len(self.layers) - 1
         if card.is_face():
-            for i, (layer_card, adjacents) in enumerate(self.layers):
-                if layer_card == on_top_of_card or on_top_of_card in adjacents:
-                    adjacents.append(card)
-                    break
+            self.layers[layer][1].append(card)
+            self.layer_of[card] = layer
+        rules.add_card(self.state, card.id, layer)
         self.update()
 
     def check_if_move_is_valid(self, card: Card, on_top_of_card: Card):
-        if card.is_numerical():
-            if len(self.layers) == 0:
-                return True  # Numerical card can be placed on an empty caravan
-            elif len(self.layers) >= 7:
-                return False  # Numerical card can't be placed on a caravan with max capacity
-            elif (layer_card := self.layers[-1][0]) == on_top_of_card or on_top_of_card in self.layers[-1][1]:
-                if (
-                        (layer_card.rank > card.rank and self.direction != ASC)
-                        or (layer_card.rank < card.rank and self.direction != DESC)
-                ):
-                    return True  # Numerical card follows caravan order (direction) and can be placed on the caravan
-                elif card.suit == self.suit and card.rank != layer_card.rank:
-                    return True  # Numerical card matches the suit of the caravan and can be placed on it
-                else:
-                    return False  # Numerical card can't be placed on caravan as it doesn't follow caravan order (direction) nor matches the caravan suit
-            else:
-                return False  # Numerical card can't be placed in the middle of the deck, must be placed as the last card
-        if card.is_face():
-            for layer_card, adjacents in self.layers:
-                if on_top_of_card == layer_card or on_top_of_card in adjacents:
-                    if len(adjacents) >= 3 and card.rank != RANK_J:
-                        return False  # Face card can't be placed on selected card with max capacity of face cards
-                    return True  # Face card can be placed on selected card
-        return False  # Face card can't be placed on an empty caravan
+        return rules.is_move_valid(self.state, card.id, self.find_layer(on_top_of_card))
 
     def update(self):
         for i, (layer_card, adjacents) in enumerate(self.layers):
@@ -281,41 +300,69 @@ class Caravan(Deck):
             self.cards[0].is_visible = True
             self.cards[0].is_hoverable = True
             self.cards[0].is_flipped = False
-        self.value = self.calculate_value()
-        self.suit = self.calculate_suit()
-        self.direction = self.calculate_direction()
 
     def remove_card(self, card):
-        for i, (layer_card, adjacents) in enumerate(self.layers):
-            if card == layer_card or card in adjacents:
-                self.layers.pop(i)
-                self.cards.remove(layer_card)
-                for adj in adjacents:
-                    self.cards.remove(adj)
-                break
+        i = self.find_layer(card)
+        self.remove_layers([] if i is None else [i])
+
+    def remove_layers(self, layers):
+        """Removes the layers at the given indices in one go and returns their cards."""
+        removed = [card for i in sorted(layers) for card in (self.layers[i][0], *self.layers[i][1])]
+        if layers:
+            rules.remove_layers(self.state, layers)
+            gone = set(layers)
+            self.layers = [layer for i, layer in enumerate(self.layers) if i not in gone]
+            for card in removed:
+                Deck.remove_card(self, card)
+                del self.layer_of[card]
+            for j in range(min(layers), len(self.layers)):
+                for moved in (self.layers[j][0], *self.layers[j][1]):
+                    self.layer_of[moved] = j
         self.update()
-    
-    def click(self, x, y):
-        for reset_card in self.cards:
-            reset_card.is_selected = False
-
-        z_cards = sort_cards_by_z_index(self.cards)
-        for card in z_cards:
-            if card.collides_with(x, y) and card.is_hoverable:
-                card.click(x, y)
-                break
+        return removed
+
+    def load_state(self, state: CaravanState, take_card):
+        """Replaces the cards with the layers of `state`; `take_card` turns a card id into a Card."""
+        placeholder = self.cards[0]
+        self.cards = [placeholder]
+        self.layers = []
+        self.layer_of = {}
+        for i, (card_id, adjacent_ids) in enumerate(state.layers):
+            layer_card = take_card(card_id)
+            adjacents = [take_card(adj) for adj in adjacent_ids]
+            for j, card in enumerate([layer_card, *adjacents]):
+                card.is_flipped = True
+                card.set_at(*caravan_card_position(self.player, self.caravan, i, j), 0)
+                self.layer_of[card] = i
+            self.layers.append([layer_card, adjacents])
+            self.cards.extend([layer_card, *adjacents])
+        self.state = state.copy()
+        self.reindex()
+        self.version += 1
+
+        placeholder.is_visible = not self.layers
+        placeholder.is_hoverable = not self.layers
+        placeholder.is_hovered = False
+        placeholder.is_selected = False
         self.update()
 
 
-def generate_starting_caravan(player: int = 1, caravan: str = 'A'):
-    starting_x = {1: 200, 2: 100}
-    starting_y = {1: 290, 2: 90}
-    offset_x = {'A': 0, 'B': 200, 'C': 400}
+CARAVAN_STARTING_X = {1: 200, 2: 100}
+CARAVAN_STARTING_Y = {1: 290, 2: 90}
+CARAVAN_OFFSET_X = {'A': 0, 'B': 200, 'C': 400}
 
+
+def caravan_card_position(player: int, caravan: str, layer: int = 0, slot: int = 0):
+    # Layers go down the table 40px apart, face cards fan out 20px to the right of their card
+    return (CARAVAN_STARTING_X[player] + CARAVAN_OFFSET_X[caravan] + 20 * slot,
+            CARAVAN_STARTING_Y[player] + 40 * layer)
+
+
+def generate_starting_caravan(player: int = 1, caravan: str = 'A'):
     cards = [PlaceholderCard()]
     cards[0].is_hoverable = True
     cards[0].is_flipped = False
-    cards[0].set_at(starting_x[player] + offset_x[caravan], starting_y[player], 0)
+    cards[0].set_at(*caravan_card_position(player, caravan), 0)
     cards[0].z_index = -10
     return cards
 
@@ -1,7 +1,14 @@
+import logging
+import time
+
 import pygame
 
+import assets
+import profiler
 from states import WinState
 
+log = logging.getLogger(__name__)
+
 # Display surface
 display_surf = None
 
@@ -12,22 +19,47 @@ from constants import WINDOW_WIDTH, WINDOW_HEIGHT, FPS
 # Colors
 BG_COLOR = (255, 150, 0)
 TEXT_COLOR = (0, 0, 0)
+TEXT_SIZE = 26
 
-BACKGROUND_IMAGE = pygame.transform.scale(pygame.image.load('assets/images/background.png'), (WINDOW_WIDTH, WINDOW_HEIGHT))
+BACKGROUND_PATH = 'assets/images/background.png'
+BACKGROUND_IMAGE = None  # Loaded by init(), once the window exists and it can be converted
 
 clock = pygame.time.Clock()
 FPS = 80
 
+# Dirty-rectangle rendering: only the parts of the window that changed since the last frame are redrawn
+DIRTY_RECTS = True
+FULL_REDRAW_SHARE = 0.5  # Above this share of the window a full redraw is cheaper
+last_frame = []
+needs_full_redraw = True
+# The window system may have drawn over the window, so whatever the last frame left there is gone
+REDRAW_EVENTS = (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.VIDEOEXPOSE)
+overlay = None
+render_stats = {'full_frames': 0, 'dirty_frames': 0, 'idle_frames': 0, 'dirty_area': 0}
+
+# Adaptive loop: while nothing animates and the frames stop changing, wait for input instead of
+# redrawing the same frame FPS times a second
+ADAPTIVE_LOOP = True
+IDLE_FRAMES = 2  # Unchanged frames in a row before the loop starts waiting
+IDLE_TIMEOUT = 500  # Milliseconds to wait for an event before drawing a frame anyway
+WAKE_EVENTS = [pygame.QUIT, pygame.KEYUP, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.VIDEORESIZE, *REDRAW_EVENTS]
+idle_streak = 0
+woke_up = False
+loop_stats = {'frames': 0, 'waits': 0, 'wait_time': 0.0, 'started': 0.0, 'cpu_started': 0.0}
+
 def init():
-    global display_surf
+    global display_surf, BACKGROUND_IMAGE, needs_full_redraw
     display_surf = pygame.display.set_mode(
         size=(WINDOW_WIDTH, WINDOW_HEIGHT),
         flags=WINDOW_FLAGS
     )
+    BACKGROUND_IMAGE = assets.image(BACKGROUND_PATH, (WINDOW_WIDTH, WINDOW_HEIGHT))
+    needs_full_redraw = True
     pygame.display.set_caption('Caravan')
+    loop_stats.update(frames=0, waits=0, wait_time=0.0, started=time.perf_counter(), cpu_started=time.process_time())
 
 def handle_events():
-    global WINDOW_WIDTH, WINDOW_HEIGHT, display_surf
+    global WINDOW_WIDTH, WINDOW_HEIGHT, display_surf, needs_full_redraw
 
     for event in pygame.event.get():
         if event.type == pygame.VIDEORESIZE:
@@ -35,83 +67,169 @@ def handle_events():
             new_height = max(round(event.h, -2), 400)
             WINDOW_WIDTH, WINDOW_HEIGHT = new_width, new_height
             display_surf = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), flags=WINDOW_FLAGS)
+            needs_full_redraw = True
+        elif event.type in REDRAW_EVENTS:
+            needs_full_redraw = True
+        elif event.type == pygame.KEYUP and event.key == profiler.HUD_KEY:
+            profiler.toggle_hud()
+        elif event.type == pygame.KEYUP and event.key == profiler.DUMP_KEY:
+            log.info('Frame times saved to %s', profiler.dump_csv())
         else:
             pygame.event.post(event)
     return True
 
-def display(state):
-    global display_surf
-    display_surf.blit(BACKGROUND_IMAGE, BACKGROUND_IMAGE.get_rect())
+def wait_for_activity(state):
+    """Blocks until there is input or IDLE_TIMEOUT passes, if the last frames were all the same."""
+    global woke_up
+    if not ADAPTIVE_LOOP or state.timeline.is_running or idle_streak < IDLE_FRAMES:
+        return
+    # Events nobody reads pile up in the queue (handle_events puts them back), and any of them would end the wait
+    pygame.event.get(exclude=WAKE_EVENTS)
+    if pygame.event.peek(WAKE_EVENTS):
+        return
+
+    started = time.perf_counter()
+    event = pygame.event.wait(IDLE_TIMEOUT)
+    if event.type not in (pygame.NOEVENT, pygame.MOUSEMOTION):
+        pygame.event.post(event)
+    loop_stats['waits'] += 1
+    loop_stats['wait_time'] += time.perf_counter() - started
+    # The wait isn't frame time: animations started by this input begin from zero
+    clock.tick()
+    woke_up = True
+
+def loop_metrics():
+    """Frames drawn and CPU seconds used per minute since init(), and the share of time spent waiting."""
+    elapsed = max(time.perf_counter() - loop_stats['started'], 1e-9)
+    return {
+        'frames_per_minute': loop_stats['frames'] * 60 / elapsed,
+        'cpu_seconds_per_minute': (time.process_time() - loop_stats['cpu_started']) * 60 / elapsed,
+        'idle_share': loop_stats['wait_time'] / elapsed,
+    }
 
-    font = pygame.font.Font('assets/font.ttf', size=26)
+def display(state):
+    global idle_streak, woke_up
+    frame = []  # (surface, position) pairs in drawing order
 
-    for animation in state.animations[:]:
-        objects = next(animation, {})
-        if not objects:
-            state.animations.remove(animation)
-            continue
-        for key, val in objects.items():
-            state.objects[key] = val
+    # Animations advance by the time the last frame took, so they last as long at any frame rate
+    state.timeline.update(0 if woke_up else clock.get_time() / 1000)
+    woke_up = False
+    profiler.lap(profiler.ANIMATIONS)
 
     currently_hovered = None
     currently_selected = None
-    for object in get_visible_objects(state.objects):
+    visible = state.objects.visible(pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
+    profiler.objects_drawn = len(visible)
+    for object in visible:
         if object.is_hovered:
             currently_hovered = object
         if object.is_selected:
             currently_selected = object
 
-        display_surf.blit(object.get_image(), object.rect)
-
-        text_surf = font.render(object.text, True, object.font_color).convert_alpha()
-        rect = text_surf.get_rect()
-        rect.center = object.rect.center
-        display_surf.blit(text_surf, rect)
+        frame.append((object.get_image(), object.rect.topleft))
+        add_text(frame, object.text, object.font_color, object.rect.center)
 
     if currently_hovered == currently_selected and currently_hovered:
         currently_hovered = None
 
     if currently_selected:
         selected_image, selected_image_rect, image, image_rect, text = currently_selected.get_clicked_params()
-        display_surf.blit(selected_image, selected_image_rect)
-        display_surf.blit(image, image_rect)
-
-        text_surf = font.render(currently_selected.text, True, currently_selected.font_color).convert_alpha()
-        rect = text_surf.get_rect()
-        rect.center = image_rect.center
-        display_surf.blit(text_surf, rect)
+        frame.append((selected_image, selected_image_rect.topleft))
+        frame.append((image, image_rect.topleft))
+        add_text(frame, currently_selected.text, currently_selected.font_color, image_rect.center)
     if currently_hovered:
         hovered_image, hovered_image_rect, image, image_rect, text = currently_hovered.get_hovered_params()
-        display_surf.blit(hovered_image, hovered_image_rect)
-        display_surf.blit(image, image_rect)
-
-        text_surf = font.render(currently_hovered.text, True, currently_hovered.font_color).convert_alpha()
-        rect = text_surf.get_rect()
-        rect.center = image_rect.center
-        display_surf.blit(text_surf, rect)
+        frame.append((hovered_image, hovered_image_rect.topleft))
+        frame.append((image, image_rect.topleft))
+        add_text(frame, currently_hovered.text, currently_hovered.font_color, image_rect.center)
 
     if isinstance(state, WinState):
-        font = pygame.font.Font('assets/font.ttf', size=42)
         text = 'Вы выиграли!' if state.winner == 1 else 'Вы проиграли.'
-        surf = font.render(text, True, TEXT_COLOR).convert_alpha()
-        rect = surf.get_rect()
-        rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50)
-        display_surf.blit(surf, rect)
+        add_text(frame, text, TEXT_COLOR, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50), size=42)
         # затемняем фон
+        frame.append((get_overlay(), (0, 0)))
+        # баннер
+        rect = state.banner.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+        frame.append((state.banner, rect.topleft))
+
+    if profiler.hud_visible:
+        hud = profiler.get_hud(clock.get_fps())
+        frame.append((hud, (WINDOW_WIDTH - hud.get_width(), 0)))
+    profiler.lap(profiler.SCENE)
+
+    idle_streak = idle_streak + 1 if frame == last_frame and not needs_full_redraw else 0
+    loop_stats['frames'] += 1
+    if DIRTY_RECTS:
+        draw_changes(frame)
+    else:
+        draw_all(frame)
+    profiler.end_frame()
+    clock.tick(FPS)
+
+def add_text(frame, text, color, center, size=TEXT_SIZE):
+    if not text:
+        return
+    profiler.lap(profiler.SCENE)
+    text_surf = assets.text(text, color, size)
+    frame.append((text_surf, text_surf.get_rect(center=center).topleft))
+    profiler.lap(profiler.TEXT)
+
+def get_overlay():
+    global overlay
+    if overlay is None or overlay.get_size() != (WINDOW_WIDTH, WINDOW_HEIGHT):
         overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
         overlay.set_alpha(160)
         overlay.fill((0, 0, 0))
-        display_surf.blit(overlay, (0, 0))
-        # баннер
-        rect = state.banner.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        display_surf.blit(state.banner, rect)
+    return overlay
 
+def draw_all(frame):
+    global last_frame, needs_full_redraw
+    display_surf.blit(BACKGROUND_IMAGE, BACKGROUND_IMAGE.get_rect())
+    for surface, position in frame:
+        display_surf.blit(surface, position)
+    profiler.lap(profiler.BLIT)
     pygame.display.update()
-    clock.tick(FPS)
-
-def get_visible_objects(objects):
-    result = []
-    for object in objects.values():
-        result.extend(object.dump())
-    result = [object for object in result if object.is_visible]
-    return sorted(result, key=lambda x: x.z_index)
\ No newline at end of file
+    profiler.lap(profiler.UPDATE)
+    last_frame, needs_full_redraw = frame, False
+    render_stats['full_frames'] += 1
+
+def draw_changes(frame):
+    """Redraws only the areas where this frame differs from the last one."""
+    global last_frame
+    if needs_full_redraw:
+        return draw_all(frame)
+
+    # Surfaces are shared and cached, so an unchanged blit is the same surface at the same spot
+    current, previous = set(frame), set(last_frame)
+    if [blit for blit in last_frame if blit in current] != [blit for blit in frame if blit in previous]:
+        return draw_all(frame)  # Something changed its place in the z-order
+
+    dirty = []
+    for surface, position in [blit for blit in frame if blit not in previous] + [blit for blit in last_frame if blit not in current]:
+        area = surface.get_rect(topleft=position)
+        for i, rect in enumerate(dirty):
+            if rect.colliderect(area):
+                dirty[i] = rect.union(area)
+                break
+        else:
+            dirty.append(area)
+    last_frame = frame
+    profiler.lap(profiler.BLIT)
+    if not dirty:
+        render_stats['idle_frames'] += 1
+        return
+    if sum(rect.w * rect.h for rect in dirty) > FULL_REDRAW_SHARE * WINDOW_WIDTH * WINDOW_HEIGHT:
+        return draw_all(frame)
+
+    for rect in dirty:
+        display_surf.set_clip(rect)
+        display_surf.blit(BACKGROUND_IMAGE, (0, 0))
+        for surface, position in frame:
+            if rect.colliderect(surface.get_rect(topleft=position)):
+                display_surf.blit(surface, position)
+    display_surf.set_clip(None)
+    profiler.lap(profiler.BLIT)
+    pygame.display.update(dirty)
+    profiler.lap(profiler.UPDATE)
+    render_stats['dirty_frames'] += 1
+    render_stats['dirty_area'] += sum(rect.w * rect.h for rect in dirty)
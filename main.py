@@ -1,19 +1,42 @@
+import logging
+
 import pygame
+import assets
+import cards
 import graphics
+import profiler
+import states
 from states import Context
 from deck_builder import MainMenuState
 
+log = logging.getLogger(__name__)
+
+def preload_game_assets():
+    # The menu only needs a few images; the rest are decoded in the background while it's up
+    return assets.preload([*cards.card_paths.values(), cards.CARD_BACK_PATH, states.TRASH_PATH, states.TRASH_OPEN_PATH,
+                           states.WIN_BANNER_PATH, states.LOSE_BANNER_PATH])
+
 def main():
+    # The loop metrics at exit and the F4 frame dump report through logging
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     pygame.init()
     graphics.init()
 
     context = Context(initial_state=MainMenuState())
+    preload_game_assets()
 
     while context.is_running():
+        graphics.wait_for_activity(context.state)
+        profiler.begin_frame()
         graphics.handle_events()
+        profiler.lap(profiler.EVENTS)
         context.handle_events()
+        profiler.lap(profiler.STATE)
         graphics.display(context.state)
 
+    metrics = graphics.loop_metrics()
+    log.info('%.0f frames/min, %.1f s CPU/min, %.0f%% idle',
+             metrics['frames_per_minute'], metrics['cpu_seconds_per_minute'], metrics['idle_share'] * 100)
     pygame.quit()
 
 if __name__ == '__main__':
@@ -1,11 +1,12 @@
+import math
 import random
+import time
+from collections import Counter
 
-from decks import PlayingDeck, Caravan
-
-
-DISCARD_CARD = 0
-DISCARD_CARAVAN = 1
-PLAY_CARD = 2
+from rules import (
+    DISCARD_CARD, DISCARD_CARAVAN, PLAY_CARD, IS_NUMERICAL, ALL_CARDS, HAND_SIZE, MIN_HAND_SIZE, OPENING_MOVES,
+    MIN_CARAVAN_THRESHOLD, MAX_CARAVAN_THRESHOLD, GameState, move_masks
+)
 
 
 class Player:
@@ -13,7 +14,7 @@ class Player:
         self.player = player
         self.beginning_phase_counter = 3
 
-    def find_possible_moves(self, playing_deck: PlayingDeck, caravans: Caravan):
+    def find_possible_moves(self, playing_deck: 'PlayingDeck', caravans: list['Caravan']):
         possibilities = {
             DISCARD_CARD: playing_deck.cards,  # List of cards
             DISCARD_CARAVAN: [],  # List of non-empty owned caravans
@@ -25,34 +26,64 @@ class Player:
             if caravan.layers:
                 possibilities[DISCARD_CARAVAN].append(caravan)
 
+        # Validity comes from the rules' precomputed masks, see rules.move_masks
+        masks = {caravan: move_masks(caravan.state) for caravan in caravans}
         for card in playing_deck.cards:
             if card.is_numerical():
                 for caravan in player_caravans:
-                    on_top_of_card = caravan.cards[0]
-                    if caravan.layers:
-                        on_top_of_card = caravan.layers[-1][0]
-                    if caravan.check_if_move_is_valid(card, on_top_of_card):
+                    if masks[caravan][0] >> card.id & 1:
+                        on_top_of_card = caravan.layers[-1][0] if caravan.layers else caravan.cards[0]
                         possibilities[PLAY_CARD].append((card, on_top_of_card, caravan))
             if card.is_face():
                 for caravan in caravans:
-                    for on_top_of_card in caravan.cards[1:]:
-                        if caravan.check_if_move_is_valid(card, on_top_of_card):
-                            possibilities[PLAY_CARD].append((card, on_top_of_card, caravan))
+                    for (layer_card, adjacents), mask in zip(caravan.layers, masks[caravan][1]):
+                        if mask >> card.id & 1:
+                            for on_top_of_card in (layer_card, *adjacents):
+                                possibilities[PLAY_CARD].append((card, on_top_of_card, caravan))
 
         return possibilities
 
+    def select_move(self, state: GameState):
+        """Headless counterpart of select_next_move: picks one of state.legal_moves() for self.player."""
+        return random.choice(state.legal_moves(self.player))
+
 
 class RandomPlayer(Player):
     def __init__(self, player=2):
         super().__init__(player)
 
-    def select_next_move(self, playing_deck: PlayingDeck, caravans: Caravan):
+    def select_next_move(self, playing_deck: 'PlayingDeck', caravans: list['Caravan']):
         possibilities = self.find_possible_moves(playing_deck, caravans)
 
         if self.beginning_phase_counter > 0:
             self.beginning_phase_counter -= 1
             return self.select_next_move_in_beginning_phase(possibilities[PLAY_CARD])
 
+        return self.select_by_type(possibilities)
+
+    def select_next_move_in_beginning_phase(self, possibilities):
+        result = []
+
+        for card, on_top_of_card, caravan in possibilities:
+            if card.is_numerical() and not caravan.layers:
+                result.append((card, on_top_of_card, caravan))
+
+        return PLAY_CARD, random.choice(result)
+
+    def select_move(self, state: GameState):
+        possibilities = {DISCARD_CARD: [], DISCARD_CARAVAN: [], PLAY_CARD: []}
+        for move in state.legal_moves(self.player):
+            possibilities[move[0]].append(move)
+
+        if state.opening[self.player - 1] > 0:
+            opening = [move for move in possibilities[PLAY_CARD] if IS_NUMERICAL[move[1]] and move[3] is None]
+            if opening:
+                return random.choice(opening)
+
+        move_type, move = self.select_by_type(possibilities)
+        return move
+
+    def select_by_type(self, possibilities):
         r = random.random()
         if r < 0.95 and possibilities[PLAY_CARD]:
             return PLAY_CARD, random.choice(possibilities[PLAY_CARD])
@@ -66,11 +97,389 @@ class RandomPlayer(Player):
             else:
                 return DISCARD_CARD, random.choice(possibilities[DISCARD_CARD])
 
-    def select_next_move_in_beginning_phase(self, possibilities):
-        result = []
 
-        for card, on_top_of_card, caravan in possibilities:
-            if card.is_numerical() and not caravan.layers:
-                result.append((card, on_top_of_card, caravan))
+def window_distance(value):
+    """How far a caravan value is from the 21-26 selling window; overshooting is harder to fix."""
+    if value < MIN_CARAVAN_THRESHOLD:
+        return MIN_CARAVAN_THRESHOLD - value
+    if value > MAX_CARAVAN_THRESHOLD:
+        return 2 * (value - MAX_CARAVAN_THRESHOLD)
+    return 0
 
-        return PLAY_CARD, random.choice(result)
+
+def evaluate(state: GameState, player):
+    """Cheap estimate in [0, 1] of how likely `player` is to win from `state`."""
+    winner = state.winner()
+    if winner:
+        return 1.0 if winner == player else 0.0
+    own = state.caravans[:3] if player == 1 else state.caravans[3:]
+    other = state.caravans[3:] if player == 1 else state.caravans[:3]
+    score = 0.0
+    for a, b in zip(own, other):
+        if a.is_sold and (not b.is_sold or a.value > b.value):
+            score += 1  # This pair would go to the player right now
+        elif b.is_sold and (not a.is_sold or b.value > a.value):
+            score -= 1
+        else:
+            # Closer to the window is better, capped so only a decided game reaches 0 or 1
+            distance = (window_distance(b.value) - window_distance(a.value)) / MIN_CARAVAN_THRESHOLD
+            score += max(-0.5, min(0.5, distance))
+    return 0.5 + score / 6
+
+
+def determinize(state: GameState, player, rng=random):
+    """Copy of `state` with everything `player` can't see reshuffled: the opponent's hand together
+    with their drawing deck, and the order of the player's own drawing deck."""
+    state = state.copy()
+    other = 2 - player
+    unseen = state.hands[other] + state.decks[other]
+    rng.shuffle(unseen)
+    hand_size = len(state.hands[other])
+    state.hands[other] = unseen[:hand_size]
+    state.decks[other] = unseen[hand_size:]
+    rng.shuffle(state.decks[player - 1])
+    state.refresh_hashes()
+    return state
+
+
+class SearchPlayer(Player):
+    """Base for the search bots: plays on the table by searching a GameState rebuilt from it."""
+
+    def __init__(self, player=2, time_budget=0.3):
+        super().__init__(player)
+        self.time_budget = time_budget  # Seconds of wall-clock time per move
+        self.turns = 0
+        self.played = set()  # Ids of our cards that left the hand, played or discarded
+        self.stats = {}
+
+    def select_next_move(self, playing_deck: 'PlayingDeck', caravans: list['Caravan']):
+        move = self.select_move(self.table_state(playing_deck, caravans))
+        self.turns += 1
+        if move[0] != DISCARD_CARAVAN:
+            self.played.add(move[1])
+        if self.beginning_phase_counter > 0 and move[0] == PLAY_CARD:
+            self.beginning_phase_counter -= 1
+        return self.to_table_move(move, playing_deck, caravans)
+
+    def table_state(self, playing_deck: 'PlayingDeck', caravans: list['Caravan']):
+        # The table only shows our hand and the caravans. Our drawing deck is whatever of our cards
+        # we haven't held yet; the opponent's hand and deck are dealt from their cards not on the
+        # caravans. Both get reshuffled by every determinization anyway.
+        other = 3 - self.player
+        hand = [card.id for card in playing_deck.cards]
+        own_deck = [card for card in ALL_CARDS if card not in self.played and card not in hand]
+        random.shuffle(own_deck)
+
+        # Each player has one card of every id. Numerical cards always sit on their owner's caravans,
+        # face cards anywhere: a face id on the table is the opponent's unless it's a single one we played.
+        own_caravans = caravans[:3] if self.player == 1 else caravans[3:]
+        seen = set()
+        faces = Counter()
+        for caravan in caravans:
+            for layer_card, adjacents in caravan.layers:
+                if caravan not in own_caravans:
+                    seen.add(layer_card.id)
+                faces.update(adj.id for adj in adjacents)
+        seen.update(card for card, count in faces.items() if count > (card in self.played))
+        other_cards = [card for card in ALL_CARDS if card not in seen]
+        random.shuffle(other_cards)
+        other_moves = self.turns + (1 if self.player == 2 else 0)
+        other_hand_size = min(max(MIN_HAND_SIZE, HAND_SIZE - other_moves), len(other_cards))
+
+        hands, decks = [None, None], [None, None]
+        hands[self.player - 1], decks[self.player - 1] = hand, own_deck
+        hands[other - 1], decks[other - 1] = other_cards[:other_hand_size], other_cards[other_hand_size:]
+
+        other_caravans = caravans[3:] if self.player == 1 else caravans[:3]
+        opening = [0, 0]
+        opening[self.player - 1] = self.beginning_phase_counter
+        if self.beginning_phase_counter > 0:
+            opening[other - 1] = max(0, OPENING_MOVES - sum(1 for caravan in other_caravans if caravan.layers))
+        return GameState([caravan.state.copy() for caravan in caravans], hands, decks, self.player, opening)
+
+    def to_table_move(self, move, playing_deck: 'PlayingDeck', caravans: list['Caravan']):
+        """Turns a rules move into the (move_type, move) tuple StandardMode.handle_events consumes."""
+        if move[0] == DISCARD_CARAVAN:
+            return DISCARD_CARAVAN, caravans[move[1]]
+        card = next(card for card in playing_deck.cards if card.id == move[1])
+        if move[0] == DISCARD_CARD:
+            return DISCARD_CARD, card
+        _, _, i, layer, slot = move
+        caravan = caravans[i]
+        if layer is None:
+            return PLAY_CARD, (card, caravan.cards[0], caravan)
+        layer_card, adjacents = caravan.layers[layer]
+        return PLAY_CARD, (card, layer_card if slot == 0 else adjacents[slot - 1], caravan)
+
+
+def rollout_move(moves):
+    # Same bias as RandomPlayer: mostly play cards, rarely discard
+    plays = [move for move in moves if move[0] == PLAY_CARD]
+    if plays and random.random() < 0.95:
+        return random.choice(plays)
+    return random.choice(moves)
+
+
+class MCTSNode:
+    __slots__ = ('visits', 'edges')
+
+    def __init__(self):
+        self.visits = 0
+        self.edges: dict[tuple, list] = {}  # move -> [visits, total reward of the player to move]
+
+
+class MCTSPlayer(SearchPlayer):
+    """Monte Carlo tree search over determinizations, anytime within `time_budget` seconds per move.
+
+    Nodes live in a transposition table keyed by what the player to move can see (board plus own
+    hand), which is kept between turns so the next search starts from the statistics of this one.
+    """
+
+    def __init__(self, player=2, time_budget=0.3, exploration=0.7, rollout_depth=30, max_nodes=200_000):
+        super().__init__(player, time_budget)
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.max_nodes = max_nodes
+        self.table: dict[int, MCTSNode] = {}
+
+    @staticmethod
+    def key(state: GameState):
+        return state.board_hash ^ state.hand_hashes[state.turn - 1]
+
+    def select_move(self, state: GameState):
+        moves = state.legal_moves(self.player)
+        if len(moves) == 1:
+            return moves[0]
+        if len(self.table) > self.max_nodes:
+            self.table.clear()  # Cheaper than pruning, and one search refills the useful part
+
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+        iterations = 0
+        while True:
+            self.iterate(determinize(state, self.player))
+            iterations += 1
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - started
+
+        # A finished game or one without moves never gets its root expanded
+        root = self.table.get(self.key(state)) or MCTSNode()
+        best = max(moves, key=lambda move: root.edges.get(move, (0,))[0], default=None)
+        self.stats = {
+            'iterations': iterations,
+            'iterations_per_second': iterations / elapsed,
+            'root_visits': root.visits,
+            'nodes': len(self.table),
+        }
+        return best
+
+    def iterate(self, state: GameState):
+        path = []
+        while state.winner() is None:
+            moves = state.legal_moves()
+            if not moves:
+                break
+            key = self.key(state)
+            node = self.table.get(key)
+            if node is None:
+                # Expansion: one new node per iteration, then a rollout from its first move
+                node = self.table[key] = MCTSNode()
+                move = rollout_move(moves)
+                path.append((node, move, state.turn))
+                state.apply_move(move)
+                break
+            move = self.select(node, moves)
+            path.append((node, move, state.turn))
+            state.apply_move(move)
+
+        reward = self.rollout(state)  # From player 1's point of view
+        for node, move, player in path:
+            node.visits += 1
+            edge = node.edges.get(move)
+            if edge is None:
+                edge = node.edges[move] = [0, 0.0]
+            edge[0] += 1
+            edge[1] += reward if player == 1 else 1 - reward
+
+    def select(self, node: MCTSNode, moves):
+        # UCB1 over the moves legal in this determinization, untried moves first
+        untried = [move for move in moves if move not in node.edges]
+        if untried:
+            return rollout_move(untried)
+        log_visits = math.log(node.visits + 1)
+        best, best_score = None, -1.0
+        for move in moves:
+            visits, total = node.edges[move]
+            score = total / visits + self.exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+    def rollout(self, state: GameState):
+        for _ in range(self.rollout_depth):
+            if state.winner() is not None:
+                break
+            moves = state.legal_moves()
+            if not moves:
+                break
+            state.apply_move(rollout_move(moves))
+        return evaluate(state, 1)
+
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class ExpectimaxPlayer(SearchPlayer):
+    """Depth-limited expectimax with iterative deepening inside `time_budget` seconds per move.
+
+    Max and min nodes use alpha-beta, chance nodes branch on up to `chance_samples` cards of the
+    drawing deck and are pruned with Star1 bounds (evaluations are in [0, 1]). The opponent's hand
+    is determinized once per move. A transposition table keyed by the Zobrist hash keeps values and
+    best moves across iterations, and moves are ordered by the TT move, then by evaluate().
+    """
+
+    def __init__(self, player=2, time_budget=0.3, max_depth=12, chance_samples=3, max_entries=500_000):
+        super().__init__(player, time_budget)
+        self.max_depth = max_depth
+        self.chance_samples = chance_samples
+        self.max_entries = max_entries
+        self.table: dict[int, tuple] = {}  # hash -> (depth, value, flag, best move)
+        self.deadline = 0.0
+        self.nodes = 0
+        self.table_hits = 0
+
+    def select_move(self, state: GameState):
+        moves = state.legal_moves(self.player)
+        if len(moves) == 1:
+            return moves[0]
+        if len(self.table) > self.max_entries:
+            self.table.clear()
+
+        root = determinize(state, self.player)
+        started = time.perf_counter()
+        self.deadline = started + self.time_budget
+        self.nodes = self.table_hits = 0
+        best, depth_nodes = moves[0], []
+        for depth in range(1, self.max_depth + 1):
+            nodes_before = self.nodes
+            try:
+                value, best = self.search_root(root, depth)
+            except SearchTimeout:
+                break
+            depth_nodes.append(self.nodes - nodes_before)
+            if value in (0.0, 1.0):
+                break  # Proven win or loss, deeper searches can't change it
+        elapsed = time.perf_counter() - started
+
+        # Effective branching factor: growth of the tree between the last two completed depths
+        branching = depth_nodes[-1] / depth_nodes[-2] if len(depth_nodes) >= 2 and depth_nodes[-2] else float(depth_nodes[-1] if depth_nodes else 0)
+        self.stats = {
+            'nodes': self.nodes,
+            'nodes_per_second': self.nodes / elapsed,
+            'depth': len(depth_nodes),
+            'branching_factor': branching,
+            'table_hits': self.table_hits,
+            'table_size': len(self.table),
+        }
+        return best
+
+    def search_root(self, state: GameState, depth):
+        alpha, best = 0.0, None
+        entry = self.table.get(state.hash)
+        for move in self.order(state, state.legal_moves(), entry[3] if entry else None, True):
+            value = self.after_move(state, move, depth - 1, alpha, 1.0)
+            if best is None or value > alpha:
+                alpha, best = value, move
+        self.table[state.hash] = (depth, alpha, EXACT, best)
+        return alpha, best
+
+    def search(self, state: GameState, depth, alpha, beta):
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if depth == 0 or state.winner() is not None:
+            return evaluate(state, self.player)
+        moves = state.legal_moves()
+        if not moves:
+            return evaluate(state, self.player)
+
+        key = state.hash
+        table_move = None
+        if (entry := self.table.get(key)) is not None:
+            entry_depth, value, flag, table_move = entry
+            if entry_depth >= depth:
+                self.table_hits += 1
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        maximizing = state.turn == self.player
+        original_alpha, original_beta = alpha, beta
+        best_value, best_move = (-1.0 if maximizing else 2.0), None
+        for move in self.order(state, moves, table_move, maximizing, depth):
+            value = self.after_move(state, move, depth - 1, alpha, beta)
+            if maximizing and value > best_value:
+                best_value, best_move = value, move
+                alpha = max(alpha, value)
+            elif not maximizing and value < best_value:
+                best_value, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_value, flag, best_move)
+        return best_value
+
+    def after_move(self, state: GameState, move, depth, alpha, beta):
+        child = state.copy()
+        mover = child.turn
+        if not child.apply_move(move, draw=False) or not child.decks[mover - 1]:
+            return self.search(child, depth, alpha, beta)
+
+        # Chance node over the card the mover draws
+        deck = child.decks[mover - 1]
+        cards = deck if len(deck) <= self.chance_samples else random.sample(deck, self.chance_samples)
+        n, total = len(cards), 0.0
+        for k, card in enumerate(cards):
+            remaining = n - k - 1
+            outcome = child.copy()
+            outcome.draw(mover, card)
+            # Star1: the window this outcome must fall in for the average to land inside (alpha, beta)
+            child_alpha = max(0.0, n * alpha - total - remaining)
+            child_beta = min(1.0, n * beta - total)
+            total += self.search(outcome, depth, child_alpha, child_beta)
+            if total >= n * beta:
+                return total / n  # Even if the rest scored 0 the average fails high
+            if total + remaining <= n * alpha:
+                return (total + remaining) / n  # Even if the rest scored 1 the average fails low
+        return total / n
+
+    def order(self, state: GameState, moves, table_move, maximizing, depth=2):
+        if depth >= 2:
+            scores = {}
+            for move in moves:
+                child = state.copy()
+                child.apply_move(move, draw=False)
+                scores[move] = evaluate(child, self.player)
+            moves = sorted(moves, key=scores.__getitem__, reverse=maximizing)
+        if table_move in moves:
+            moves = [table_move] + [move for move in moves if move != table_move]
+        return moves
@@ -0,0 +1,114 @@
+"""Per-frame timings of the main loop phases, kept for the last FRAMES frames.
+
+Timing is always on and costs a perf_counter_ns call per phase; only drawing the HUD costs more.
+"""
+import csv
+import time
+
+import pygame
+
+import assets
+
+EVENTS, STATE, ANIMATIONS, SCENE, TEXT, BLIT, UPDATE = range(7)
+PHASES = ('events', 'state', 'animations', 'scene', 'text', 'blit', 'update')
+
+FRAMES = 600  # Frames kept in the ring buffer, about 7.5 seconds at 80 FPS
+HUD_KEY = pygame.K_F3
+DUMP_KEY = pygame.K_F4
+HUD_REFRESH = 20  # Frames between HUD redraws, so the numbers can be read
+HUD_SIZE = 18
+HUD_COLOR = (255, 255, 255)
+HUD_BACKGROUND = (0, 0, 0, 170)
+
+# Ring buffer: row i holds the phase times of a frame in ns, then its total and the number of objects drawn
+frames = [[0] * (len(PHASES) + 2) for _ in range(FRAMES)]
+count = 0  # Frames recorded so far; the latest one is in row (count - 1) % FRAMES
+current = [0] * len(PHASES)
+objects_drawn = 0
+frame_started = 0
+last_lap = 0
+
+hud_visible = False
+hud = None  # Surface with the HUD, rebuilt every HUD_REFRESH frames
+
+
+def begin_frame():
+    global frame_started, last_lap, objects_drawn
+    frame_started = last_lap = time.perf_counter_ns()
+    objects_drawn = 0
+    for phase in range(len(current)):
+        current[phase] = 0
+
+
+def lap(phase):
+    """Adds the time since the previous lap (or the start of the frame) to `phase`."""
+    global last_lap
+    now = time.perf_counter_ns()
+    current[phase] += now - last_lap
+    last_lap = now
+
+
+def end_frame():
+    global count
+    row = frames[count % FRAMES]
+    row[:len(PHASES)] = current
+    row[-2] = last_lap - frame_started
+    row[-1] = objects_drawn
+    count += 1
+
+
+def recorded():
+    """Rows of the recorded frames, oldest first."""
+    if count < FRAMES:
+        return frames[:count]
+    start = count % FRAMES
+    return frames[start:] + frames[:start]
+
+
+def percentiles(column, ps=(50, 95, 99)):
+    """Nearest-rank percentiles in ms of a column of recorded(): a phase index, or -2 for the whole frame."""
+    values = sorted(row[column] for row in recorded())
+    if not values:
+        return [0.0] * len(ps)
+    return [values[min(len(values) - 1, len(values) * p // 100)] / 1e6 for p in ps]
+
+
+def dump_csv(path=None):
+    path = path or time.strftime('frames_%Y%m%d_%H%M%S.csv')
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['frame', *(f'{phase}_ns' for phase in PHASES), 'total_ns', 'objects'])
+        for i, row in enumerate(recorded(), start=max(count - FRAMES, 0)):
+            writer.writerow([i, *row])
+    return path
+
+
+def toggle_hud():
+    global hud_visible, hud
+    hud_visible = not hud_visible
+    hud = None
+
+
+def get_hud(fps):
+    """The HUD surface, rebuilt every HUD_REFRESH frames."""
+    global hud
+    if hud is None or count % HUD_REFRESH == 0:
+        p50, p99 = percentiles(-2, (50, 99))
+        image_lookups = assets.stats['hits'] + assets.stats['misses']
+        lines = [
+            f'{fps:.0f} FPS   frame {p50:.2f} ms   p99 {p99:.2f} ms',
+            f'objects drawn {frames[(count - 1) % FRAMES][-1]}',
+            *(f'{phase:<11}{percentiles(i, (50,))[0]:.3f} ms' for i, phase in enumerate(PHASES)),
+            'cache hits: image {:.0%} rotation {:.0%} tint {:.0%} text {:.0%} flip {:.0%}'.format(
+                assets.stats['hits'] / image_lookups if image_lookups else 0.0,
+                *(assets.hit_rate(kind) for kind in ('rotation', 'tint', 'text', 'flip'))
+            ),
+        ]
+        # Rendered directly: the numbers change all the time and would only churn the text cache
+        font = assets.font(HUD_SIZE)
+        rendered = [font.render(line, True, HUD_COLOR) for line in lines]
+        hud = pygame.Surface((max(line.get_width() for line in rendered) + 16, len(rendered) * font.get_linesize() + 12), pygame.SRCALPHA)
+        hud.fill(HUD_BACKGROUND)
+        for i, line in enumerate(rendered):
+            hud.blit(line, (8, 6 + i * font.get_linesize()))
+    return hud
@@ -0,0 +1,583 @@
+import random
+
+# Caravan rules on plain integer card ids. This module must not import pygame:
+# the sprites in cards/decks and the headless simulators both sit on top of it.
+
+RANK_A = 1
+RANK_2 = 2
+RANK_3 = 3
+RANK_4 = 4
+RANK_5 = 5
+RANK_6 = 6
+RANK_7 = 7
+RANK_8 = 8
+RANK_9 = 9
+RANK_10 = 10
+RANK_J = 11
+RANK_Q = 12
+RANK_K = 13
+RANK_JOKER = 14
+
+SUIT_SPADES = 1
+SUIT_HEARTS = 2
+SUIT_DIAMONDS = 3
+SUIT_CLUBS = 4
+SUIT_BLACK_JOKER = 5
+SUIT_RED_JOKER = 6
+
+RANKS = [RANK_A, RANK_2, RANK_3, RANK_4, RANK_5, RANK_6, RANK_7, RANK_8, RANK_9, RANK_10, RANK_J, RANK_Q, RANK_K, RANK_JOKER]
+SUITS = [SUIT_SPADES, SUIT_HEARTS, SUIT_DIAMONDS, SUIT_CLUBS, SUIT_BLACK_JOKER, SUIT_RED_JOKER]
+
+DESC = -1
+UNDEFINED = 0
+ASC = 1
+
+MIN_CARAVAN_THRESHOLD = 21
+MAX_CARAVAN_THRESHOLD = 26
+
+DISCARD_CARD = 0
+DISCARD_CARAVAN = 1
+PLAY_CARD = 2
+
+MAX_LAYERS = 7  # Numerical cards per caravan
+MAX_FACES = 3  # Face cards attached to one numerical card (jacks are always allowed)
+
+HAND_SIZE = 8
+MIN_HAND_SIZE = 5
+OPENING_MOVES = 3
+
+# Card ids follow the order of decks.generate_all_cards(): rank-major over the four
+# regular suits, so ids 0-39 are the numerical cards, followed by the two jokers.
+NUM_CARDS = 54
+BLACK_JOKER = 52
+RED_JOKER = 53
+
+
+def card_id(rank, suit):
+    if rank == RANK_JOKER:
+        return BLACK_JOKER if suit == SUIT_BLACK_JOKER else RED_JOKER
+    return (rank - 1) * 4 + suit - 1
+
+
+RANK_OF = tuple([cid // 4 + 1 for cid in range(52)] + [RANK_JOKER, RANK_JOKER])
+SUIT_OF = tuple([cid % 4 + 1 for cid in range(52)] + [SUIT_BLACK_JOKER, SUIT_RED_JOKER])
+IS_NUMERICAL = tuple(RANK_A <= rank <= RANK_10 for rank in RANK_OF)
+ALL_CARDS = tuple(range(NUM_CARDS))
+# Bit sets of the numerical card ids of each rank and of each suit, for finding a joker's victims
+RANK_MASKS = tuple(sum(1 << card for card in ALL_CARDS if IS_NUMERICAL[card] and RANK_OF[card] == rank) for rank in range(RANK_JOKER + 1))
+SUIT_MASKS = tuple(sum(1 << card for card in ALL_CARDS if IS_NUMERICAL[card] and SUIT_OF[card] == suit) for suit in range(SUIT_RED_JOKER + 1))
+
+# Zobrist keys. A caravan card is keyed by (caravan, layer, slot, card), slot 0 being the
+# numerical card and 1.. its face cards; one extra slot covers a jack on a full layer.
+SLOTS = MAX_FACES + 2
+_zobrist_rng = random.Random(0xCA7A7A)
+ZOBRIST_CARAVAN = tuple(_zobrist_rng.getrandbits(64) for _ in range(6 * MAX_LAYERS * SLOTS * NUM_CARDS))
+ZOBRIST_HAND = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(NUM_CARDS)) for _ in range(2))
+ZOBRIST_DECK = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(NUM_CARDS)) for _ in range(2))
+ZOBRIST_OPENING = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(OPENING_MOVES + 1)) for _ in range(2))
+ZOBRIST_TURN = _zobrist_rng.getrandbits(64)
+del _zobrist_rng
+
+
+def calculate_value(layers):
+    value = 0
+    for card, adjacents in layers:
+        value += RANK_OF[card] << sum(1 for adj in adjacents if RANK_OF[adj] == RANK_K)
+    return value
+
+
+def calculate_suit(layers):
+    if not layers:
+        return UNDEFINED
+    card, adjacents = layers[-1]
+    suit = SUIT_OF[card]
+    for adj in adjacents:
+        if RANK_OF[adj] == RANK_Q:
+            suit = SUIT_OF[adj]
+    return suit
+
+
+def calculate_direction(layers):
+    if len(layers) <= 1:
+        return UNDEFINED
+    # Yes, if the last two cards have the same rank, FNV considers the caravan as decreasing
+    direction = DESC if RANK_OF[layers[-2][0]] >= RANK_OF[layers[-1][0]] else ASC
+    for adj in layers[-1][1]:
+        if RANK_OF[adj] == RANK_Q:
+            direction = -direction
+    return direction
+
+
+def is_sold(value):
+    return MIN_CARAVAN_THRESHOLD <= value <= MAX_CARAVAN_THRESHOLD
+
+
+def layer_value(layer):
+    card, adjacents = layer
+    kings = 0
+    for adj in adjacents:
+        if RANK_OF[adj] == RANK_K:
+            kings += 1
+    return RANK_OF[card] << kings
+
+
+def zobrist_key(index, layer, slot, card):
+    return ZOBRIST_CARAVAN[((index * MAX_LAYERS + layer) * SLOTS + slot) * NUM_CARDS + card]
+
+
+def layer_hash(index, layer, cards):
+    key = 0
+    for slot, card in enumerate(cards):
+        key ^= zobrist_key(index, layer, slot, card)
+    return key
+
+
+class CaravanState:
+    __slots__ = ('layers', 'index', 'value', 'suit', 'direction', 'is_sold', 'hash', 'masks', 'numerals')
+
+    def __init__(self, layers=None, index=0):
+        # Each layer is [numerical card id, [attached face card ids]]
+        self.layers: list[list] = layers if layers is not None else []
+        self.index = index  # Position among the six caravans, only used for hashing
+        self.refresh()
+
+    def refresh(self):
+        """Recomputes score and hash from scratch. add_card and remove_layer keep them up to date."""
+        self.value = calculate_value(self.layers)
+        self.suit = calculate_suit(self.layers)
+        self.direction = calculate_direction(self.layers)
+        self.is_sold = is_sold(self.value)
+        self.masks = None
+        self.numerals = 0  # Bit set of the numerical card ids of the layers
+        self.hash = 0
+        for i, (card, adjacents) in enumerate(self.layers):
+            self.numerals |= 1 << card
+            self.hash ^= layer_hash(self.index, i, [card, *adjacents])
+
+    def refresh_top(self):
+        # Suit and direction only depend on the last two layers
+        self.suit = calculate_suit(self.layers)
+        self.direction = calculate_direction(self.layers)
+
+    def copy(self):
+        caravan = CaravanState.__new__(CaravanState)
+        caravan.layers = [[card, adjacents[:]] for card, adjacents in self.layers]
+        caravan.index = self.index
+        caravan.value = self.value
+        caravan.suit = self.suit
+        caravan.direction = self.direction
+        caravan.is_sold = self.is_sold
+        caravan.hash = self.hash
+        caravan.masks = self.masks
+        caravan.numerals = self.numerals
+        return caravan
+
+    def __repr__(self):
+        return f'CaravanState({self.layers!r})'
+
+
+def numeric_rule(rank, suit, top, caravan_suit, direction, layer_count):
+    if layer_count == 0:
+        return True  # Numerical card can be placed on an empty caravan
+    if layer_count >= MAX_LAYERS:
+        return False  # Numerical card can't be placed on a caravan with max capacity
+    if (top > rank and direction != ASC) or (top < rank and direction != DESC):
+        return True  # Card follows caravan order (direction)
+    return suit == caravan_suit and rank != top  # Card matches the suit of the caravan
+
+
+def numeric_key(layer_count, top, caravan_suit, direction):
+    return ((layer_count * (RANK_10 + 1) + top) * (SUIT_CLUBS + 1) + caravan_suit) * 3 + direction + 1
+
+
+# Move tables. NUMERIC_MASKS is numeric_rule tabulated by (layer count, top rank, caravan suit,
+# direction), with the played card's rank and suit folded into a bit set of card ids.
+# A layer with a free face slot takes any face card, a full one only takes jacks.
+NUMERIC_MASKS = [0] * numeric_key(MAX_LAYERS + 1, 0, 0, DESC)
+for _layer_count in range(MAX_LAYERS + 1):
+    for _top in range(RANK_10 + 1):
+        for _suit in range(SUIT_CLUBS + 1):
+            for _direction in (DESC, UNDEFINED, ASC):
+                NUMERIC_MASKS[numeric_key(_layer_count, _top, _suit, _direction)] = sum(
+                    1 << card for card in range(NUM_CARDS)
+                    if IS_NUMERICAL[card] and numeric_rule(RANK_OF[card], SUIT_OF[card], _top, _suit, _direction, _layer_count)
+                )
+NUMERIC_MASKS = tuple(NUMERIC_MASKS)
+del _layer_count, _top, _suit, _direction
+FACE_MASK = sum(1 << card for card in range(NUM_CARDS) if not IS_NUMERICAL[card])
+JACK_MASK = sum(1 << card for card in range(NUM_CARDS) if RANK_OF[card] == RANK_J)
+
+
+def move_masks(caravan: CaravanState):
+    """(numerical card mask for the top, face card mask per layer), cached until the caravan changes."""
+    if caravan.masks is None:
+        layers = caravan.layers
+        top = RANK_OF[layers[-1][0]] if layers else 0
+        numeric = NUMERIC_MASKS[numeric_key(len(layers), top, caravan.suit, caravan.direction)]
+        faces = tuple(FACE_MASK if len(adjacents) < MAX_FACES else JACK_MASK for _, adjacents in layers)
+        caravan.masks = (numeric, faces)
+    return caravan.masks
+
+
+def is_move_valid(caravan: CaravanState, card, layer):
+    """`layer` is the index of the layer holding the target card, None for the empty outline."""
+    numeric, faces = move_masks(caravan)
+    if IS_NUMERICAL[card]:
+        if faces and layer != len(faces) - 1:
+            return False  # Numerical card can't be placed in the middle of the caravan
+        return bool(numeric >> card & 1)
+    if layer is None or not 0 <= layer < len(faces):
+        return False  # Face card can't be placed on an empty caravan
+    return bool(faces[layer] >> card & 1)
+
+
+def add_card(caravan: CaravanState, card, layer):
+    layers = caravan.layers
+    rank = RANK_OF[card]
+    if IS_NUMERICAL[card]:
+        layers.append([card, []])
+        caravan.numerals |= 1 << card
+        caravan.hash ^= zobrist_key(caravan.index, len(layers) - 1, 0, card)
+        caravan.value += rank
+        caravan.suit = SUIT_OF[card]
+        if len(layers) > 1:
+            caravan.direction = DESC if RANK_OF[layers[-2][0]] >= rank else ASC
+    else:
+        if rank == RANK_K:
+            caravan.value += layer_value(layers[layer])  # A king doubles its layer
+        adjacents = layers[layer][1]
+        adjacents.append(card)
+        caravan.hash ^= zobrist_key(caravan.index, layer, len(adjacents), card)
+        if rank == RANK_Q and layer == len(layers) - 1:
+            caravan.suit = SUIT_OF[card]
+            caravan.direction = -caravan.direction
+    caravan.is_sold = is_sold(caravan.value)
+    caravan.masks = None
+
+
+def remove_layer(caravan: CaravanState, layer):
+    layers = caravan.layers
+    index = caravan.index
+    # Layers above the removed one shift down, so their keys move with them
+    for i in range(layer, len(layers)):
+        card, adjacents = layers[i]
+        caravan.hash ^= layer_hash(index, i, [card, *adjacents])
+        if i > layer:
+            caravan.hash ^= layer_hash(index, i - 1, [card, *adjacents])
+    removed = layers.pop(layer)
+    caravan.numerals &= ~(1 << removed[0])
+    caravan.value -= layer_value(removed)
+    caravan.is_sold = is_sold(caravan.value)
+    caravan.masks = None
+    if layer >= len(layers) - 1:
+        caravan.refresh_top()
+    return removed
+
+
+def remove_layers(caravan: CaravanState, layers):
+    """Removes the layers at several indices at once, rescoring and rehashing the caravan once."""
+    if len(layers) == 1:
+        return [remove_layer(caravan, layers[0])]
+    old = caravan.layers
+    index = caravan.index
+    first = min(layers)
+    gone = set(layers)
+    for i in range(first, len(old)):
+        card, adjacents = old[i]
+        caravan.hash ^= layer_hash(index, i, [card, *adjacents])
+    removed = [old[i] for i in sorted(gone)]
+    old[first:] = [layer for i, layer in enumerate(old[first:], first) if i not in gone]
+    for i in range(first, len(old)):
+        card, adjacents = old[i]
+        caravan.hash ^= layer_hash(index, i, [card, *adjacents])
+    for layer in removed:
+        caravan.numerals &= ~(1 << layer[0])
+        caravan.value -= layer_value(layer)
+    caravan.is_sold = is_sold(caravan.value)
+    caravan.masks = None
+    caravan.refresh_top()
+    return removed
+
+
+def clear(caravan: CaravanState):
+    caravan.layers.clear()
+    caravan.value = 0
+    caravan.suit = UNDEFINED
+    caravan.direction = UNDEFINED
+    caravan.is_sold = False
+    caravan.hash = 0
+    caravan.masks = None
+    caravan.numerals = 0
+
+
+def joker_victims(caravans, caravan_index, layer, slot=0):
+    """Layers knocked out by a joker played on slot `slot` of a layer (0 is the numerical card).
+
+    Returns {caravan index: layer indices, descending} for the caravans that lose any layers.
+    Each caravan's bit set of numerical cards tells whether it has victims at all, so only
+    those caravans have their layers looked at.
+    """
+    layer_card, adjacents = caravans[caravan_index].layers[layer]
+    target = layer_card if slot == 0 else adjacents[slot - 1]
+    if not IS_NUMERICAL[target]:
+        return {}
+    if RANK_OF[target] == RANK_A:
+        # Joker on an ace removes every other card of the ace's suit
+        wanted = SUIT_MASKS[SUIT_OF[target]] & ~RANK_MASKS[RANK_A]
+    else:
+        wanted = RANK_MASKS[RANK_OF[target]]
+    victims = {}
+    for i, caravan in enumerate(caravans):
+        if not caravan.numerals & wanted:
+            continue
+        layers = caravan.layers
+        found = []
+        for j in range(len(layers) - 1, -1, -1):
+            if wanted >> layers[j][0] & 1 and (i != caravan_index or j != layer):
+                found.append(j)
+        if found:
+            victims[i] = found
+    return victims
+
+
+def winner(values):
+    """1, 2 or None for six caravan values ordered A, B, C of player 1 then of player 2."""
+    p1_wins = p2_wins = 0
+    for v1, v2 in zip(values[:3], values[3:]):
+        in_range1, in_range2 = is_sold(v1), is_sold(v2)
+        if in_range1 and (not in_range2 or v1 > v2):
+            p1_wins += 1
+        elif in_range2 and (not in_range1 or v2 > v1):
+            p2_wins += 1
+    if p1_wins >= 2:
+        return 1
+    if p2_wins >= 2:
+        return 2
+    return None
+
+
+def deal(rng=random, cards=None):
+    """Opening hand and drawing deck, like decks.generate_valid_player_and_drawing_deck.
+
+    The drawing deck is returned with its top card last.
+    """
+    cards = list(ALL_CARDS if cards is None else cards)
+    numeric = rng.sample([card for card in cards if IS_NUMERICAL[card]], OPENING_MOVES)
+    cards = [card for card in cards if card not in numeric]
+    rng.shuffle(cards)
+    hand = numeric + cards[:HAND_SIZE - OPENING_MOVES]
+    deck = cards[HAND_SIZE - OPENING_MOVES:]
+    deck.reverse()
+    return hand, deck
+
+
+class PackedState(tuple):
+    """Immutable snapshot made by GameState.pack(); hashing it is O(1) through its Zobrist key.
+
+    Layout: 6 * MAX_LAYERS layer words (card id + 1 in 6-bit slots, numerical card first),
+    both hands in hand order and both drawing decks with the top card last, also in 6-bit slots,
+    then turn, both opening counters, move count and the Zobrist hash.
+    """
+    __slots__ = ()
+
+    def __hash__(self):
+        return self[-1]
+
+
+def pack_cards(cards):
+    word = 0
+    for i, card in enumerate(cards):
+        word |= (card + 1) << (6 * i)
+    return word
+
+
+def unpack_cards(word):
+    cards = []
+    while word:
+        cards.append((word & 63) - 1)
+        word >>= 6
+    return cards
+
+
+class GameState:
+    __slots__ = ('caravans', 'hands', 'decks', 'turn', 'opening', 'moves', 'hand_hashes', 'deck_hashes')
+
+    def __init__(self, caravans=None, hands=None, decks=None, turn=1, opening=None, moves=0):
+        # Caravans 0-2 belong to player 1 and 3-5 to player 2. Players are numbered 1 and 2
+        # like everywhere else, so their hands and drawing decks live at index player - 1.
+        self.caravans: list[CaravanState] = caravans if caravans is not None else [CaravanState(index=i) for i in range(6)]
+        for i, caravan in enumerate(self.caravans):
+            if caravan.index != i:
+                caravan.index = i
+                caravan.refresh()
+        self.hands: list[list[int]] = hands if hands is not None else [[], []]
+        self.decks: list[list[int]] = decks if decks is not None else [[], []]
+        self.turn = turn
+        self.opening = opening if opening is not None else [OPENING_MOVES, OPENING_MOVES]
+        self.moves = moves
+        self.refresh_hashes()
+
+    def refresh_hashes(self):
+        # Needed after hands or drawing decks are replaced wholesale, apply_move keeps them up to date
+        self.hand_hashes = [0, 0]
+        self.deck_hashes = [0, 0]
+        for p in range(2):
+            for card in self.hands[p]:
+                self.hand_hashes[p] ^= ZOBRIST_HAND[p][card]
+            for card in self.decks[p]:
+                self.deck_hashes[p] ^= ZOBRIST_DECK[p][card]
+
+    @classmethod
+    def new_game(cls, rng=random, decks=(None, None)):
+        hand_1, deck_1 = deal(rng, decks[0])
+        hand_2, deck_2 = deal(rng, decks[1])
+        return cls(hands=[hand_1, hand_2], decks=[deck_1, deck_2])
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.caravans = [caravan.copy() for caravan in self.caravans]
+        state.hands = [self.hands[0][:], self.hands[1][:]]
+        state.decks = [self.decks[0][:], self.decks[1][:]]
+        state.turn = self.turn
+        state.opening = self.opening[:]
+        state.moves = self.moves
+        state.hand_hashes = self.hand_hashes[:]
+        state.deck_hashes = self.deck_hashes[:]
+        return state
+
+    @property
+    def board_hash(self):
+        """Hash of everything both players can see: caravans, turn and opening counters."""
+        key = ZOBRIST_TURN if self.turn == 2 else 0
+        for caravan in self.caravans:
+            key ^= caravan.hash
+        return key ^ ZOBRIST_OPENING[0][self.opening[0]] ^ ZOBRIST_OPENING[1][self.opening[1]]
+
+    @property
+    def hash(self):
+        return self.board_hash ^ self.hand_hashes[0] ^ self.hand_hashes[1] ^ self.deck_hashes[0] ^ self.deck_hashes[1]
+
+    def pack(self):
+        words = []
+        for caravan in self.caravans:
+            for card, adjacents in caravan.layers:
+                words.append(pack_cards([card, *adjacents]))
+            words.extend([0] * (MAX_LAYERS - len(caravan.layers)))
+        return PackedState((
+            *words,
+            pack_cards(self.hands[0]), pack_cards(self.hands[1]),
+            pack_cards(self.decks[0]), pack_cards(self.decks[1]),
+            self.turn, self.opening[0], self.opening[1], self.moves, self.hash
+        ))
+
+    @classmethod
+    def unpack(cls, packed: PackedState):
+        caravans = []
+        for i in range(6):
+            layers = []
+            for word in packed[i * MAX_LAYERS:(i + 1) * MAX_LAYERS]:
+                if word:
+                    card, *adjacents = unpack_cards(word)
+                    layers.append([card, adjacents])
+            caravans.append(CaravanState(layers, index=i))
+        hands_at = 6 * MAX_LAYERS
+        hand_1, hand_2, deck_1, deck_2, turn, opening_1, opening_2, moves, _ = packed[hands_at:]
+        return cls(caravans, [unpack_cards(hand_1), unpack_cards(hand_2)], [unpack_cards(deck_1), unpack_cards(deck_2)],
+                   turn, [opening_1, opening_2], moves)
+
+    def own_caravans(self, player=None):
+        player = player or self.turn
+        return range(0, 3) if player == 1 else range(3, 6)
+
+    def values(self):
+        return [caravan.value for caravan in self.caravans]
+
+    def winner(self):
+        return winner(self.values())
+
+    def legal_moves(self, player=None):
+        player = player or self.turn
+        hand = self.hands[player - 1]
+        own = self.own_caravans(player)
+        moves = []
+
+        if self.opening[player - 1] > 0:
+            # Beginning phase: one numerical card on each empty own caravan
+            for card in hand:
+                if IS_NUMERICAL[card]:
+                    for i in own:
+                        if not self.caravans[i].layers:
+                            moves.append((PLAY_CARD, card, i, None, 0))
+            if moves:
+                return moves
+
+        # Only caravans changed since the last call rebuild their masks, see move_masks
+        masks = [move_masks(caravan) for caravan in self.caravans]
+        for card in hand:
+            if IS_NUMERICAL[card]:
+                for i in own:
+                    numeric, faces = masks[i]
+                    if numeric >> card & 1:
+                        moves.append((PLAY_CARD, card, i, len(faces) - 1 if faces else None, 0))
+            else:
+                for i, (_, faces) in enumerate(masks):
+                    for layer, mask in enumerate(faces):
+                        if mask >> card & 1:
+                            moves.append((PLAY_CARD, card, i, layer, 0))
+        for card in hand:
+            moves.append((DISCARD_CARD, card))
+        for i in own:
+            if self.caravans[i].layers:
+                moves.append((DISCARD_CARAVAN, i))
+        return moves
+
+    def apply_move(self, move, draw=True):
+        """Plays `move` for the player to move. Returns whether the move owes that player a card
+        from their drawing deck; with draw=False the card isn't drawn, so search can branch on it."""
+        player = self.turn
+        hand = self.hands[player - 1]
+        move_type = move[0]
+        owed = False
+
+        if move_type == DISCARD_CARD:
+            hand.remove(move[1])
+            self.hand_hashes[player - 1] ^= ZOBRIST_HAND[player - 1][move[1]]
+            owed = True
+        elif move_type == DISCARD_CARAVAN:
+            clear(self.caravans[move[1]])
+        else:
+            _, card, i, layer, slot = move
+            hand.remove(card)
+            self.hand_hashes[player - 1] ^= ZOBRIST_HAND[player - 1][card]
+            add_card(self.caravans[i], card, layer)
+            if RANK_OF[card] == RANK_J:
+                remove_layer(self.caravans[i], layer)
+            elif RANK_OF[card] == RANK_JOKER:
+                for victim_caravan, victim_layers in joker_victims(self.caravans, i, layer, slot).items():
+                    remove_layers(self.caravans[victim_caravan], victim_layers)
+            if self.opening[player - 1] > 0:
+                self.opening[player - 1] -= 1
+            owed = len(hand) < MIN_HAND_SIZE
+
+        if owed and draw:
+            self.draw(player)
+        self.turn = 3 - player
+        self.moves += 1
+        return owed
+
+    def draw(self, player, card=None):
+        """Moves the top card of the player's drawing deck, or the given card from it, to their hand."""
+        deck = self.decks[player - 1]
+        if not deck:
+            return
+        if card is None:
+            card = deck.pop()
+        else:
+            deck.remove(card)
+        self.hands[player - 1].append(card)
+        self.deck_hashes[player - 1] ^= ZOBRIST_DECK[player - 1][card]
+        self.hand_hashes[player - 1] ^= ZOBRIST_HAND[player - 1][card]
+
+    def __repr__(self):
+        return (f'GameState(turn={self.turn}, moves={self.moves}, values={self.values()}, '
+                f'hands={self.hands!r}, decks={[len(deck) for deck in self.decks]})')
@@ -0,0 +1,182 @@
+import bisect
+
+# Layers are drawn bottom to top, objects within a layer by z_index
+TABLE = 0  # Everything kept in State.objects: cards in their decks and caravans, buttons, counters
+EFFECTS = 1  # Cards animated outside of any deck, e.g. on their way to the discard pile
+
+CELL_SIZE = 64  # Side of the hit-testing grid cells, in pixels
+
+
+class Drawable:
+    """A leaf of the scene: tells the scene it belongs to when its z_index or bounds change."""
+    __slots__ = ()  # So that subclasses can do without a __dict__
+    scene = None
+    _z_index = 0
+    hover_anywhere = False  # Whether hover() has to run even when the mouse is nowhere near
+
+    def moved(self):
+        if self.scene is not None:
+            self.scene.relocated.add(self)
+
+    @property
+    def z_index(self):
+        return self._z_index
+
+    @z_index.setter
+    def z_index(self, z_index):
+        if z_index != self._z_index:
+            self._z_index = z_index
+            if self.scene is not None:
+                self.scene.restacked.add(self)
+
+
+class Scene(dict):
+    """State.objects that also keeps their leaves (the dump() of every object) sorted for drawing.
+
+    The draw list is only rebuilt when objects are added, replaced or removed, or when a deck's
+    cards change (decks bump their version); a changed z_index just moves that one leaf.
+    The leaves are also kept in a uniform grid by their rects, so hit tests only look at the
+    leaves in the cell under the mouse.
+    """
+
+    def __init__(self, objects=None):
+        super().__init__()
+        self.transient = []  # Leaves drawn in the EFFECTS layer until clear_transient()
+        self.indexed = {}  # key -> (object, its version) as of the last rebuild
+        self.order = []  # Sorted (layer, z_index, sequence) of the leaves
+        self.leaves = []  # The leaves in drawing order, parallel to self.order
+        self.sort_key = {}  # leaf -> its entry in self.order
+        self.restacked = set()
+        self.grid = {}  # (column, row) -> leaves whose rect overlaps that cell
+        self.cells_of = {}  # leaf -> the cells it's in
+        self.relocated = set()
+        self.hovered = set()  # Leaves that were hovered after the last hover()
+        self.hovered_anywhere = []  # Leaves with hover_anywhere set
+        self.needs_rebuild = True
+        for key, value in (objects or {}).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        old = self.get(key)
+        super().__setitem__(key, value)
+        if old is value:
+            return
+        if old is not None and key in self.indexed and not self.needs_rebuild and old.dump() == value.dump():
+            # Same leaves in a new object, e.g. a hand rebuilt by every frame of an animation
+            self.indexed[key] = (value, getattr(value, 'version', None))
+        else:
+            self.needs_rebuild = True
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.needs_rebuild = True
+
+    def add_transient(self, leaf):
+        # Leaves that are also in a deck are drawn there, so adding them changes nothing
+        if leaf not in self.transient:
+            self.transient.append(leaf)
+            self.needs_rebuild = True
+
+    def clear_transient(self):
+        if self.transient:
+            # Leaves that are also in a deck get the scene back with the rebuild
+            for leaf in self.transient:
+                if leaf.scene is self:
+                    leaf.scene = None
+            self.transient.clear()
+            self.needs_rebuild = True
+
+    def detach(self):
+        """Forgets all leaves, for a scene that is going away; they stop reporting their moves to it."""
+        for leaf in self.leaves:
+            if leaf.scene is self:
+                leaf.scene = None
+        self.needs_rebuild = True
+
+    def visible(self, viewport):
+        """Visible leaves that overlap `viewport`, in drawing order."""
+        self.sync()
+        return [leaf for leaf in self.leaves if leaf.is_visible and viewport.colliderect(leaf.rect)]
+
+    def at(self, x, y):
+        """Leaves whose shape contains the point, topmost first."""
+        self.sync()
+        cell = self.grid.get((int(x) // CELL_SIZE, int(y) // CELL_SIZE), ())
+        hits = [leaf for leaf in cell if leaf.collides_with(x, y)]
+        hits.sort(key=self.sort_key.__getitem__, reverse=True)
+        return hits
+
+    def hover(self, x, y):
+        """Calls hover() on the leaves the mouse may have entered or left instead of on all of them."""
+        self.sync()
+        candidates = self.hovered.union(self.grid.get((int(x) // CELL_SIZE, int(y) // CELL_SIZE), ()))
+        candidates.update(self.hovered_anywhere)
+        for leaf in candidates:
+            leaf.hover(x, y)
+        self.hovered = {leaf for leaf in candidates if leaf.is_hovered}
+
+    def sync(self):
+        if not self.needs_rebuild:
+            self.needs_rebuild = any(getattr(obj, 'version', None) != version for obj, version in self.indexed.values())
+        if self.needs_rebuild:
+            self.rebuild()
+        else:
+            for leaf in self.restacked:
+                if leaf in self.sort_key:
+                    self.restack(leaf)
+            for leaf in self.relocated:
+                if leaf in self.cells_of:
+                    self.place(leaf)
+        self.restacked.clear()
+        self.relocated.clear()
+
+    def rebuild(self):
+        entries = []
+        seen = set()
+        groups = [(TABLE, obj.dump()) for obj in self.values()] + [(EFFECTS, self.transient)]
+        for layer, leaves in groups:
+            for leaf in leaves:
+                if leaf not in seen:
+                    seen.add(leaf)
+                    entries.append(((layer, leaf.z_index, len(entries)), leaf))
+        entries.sort(key=lambda entry: entry[0])
+
+        for leaf in self.leaves:
+            if leaf not in seen and leaf.scene is self:
+                leaf.scene = None  # Dropped out, so its moves are no longer this scene's business
+        self.order = [key for key, _ in entries]
+        self.leaves = [leaf for _, leaf in entries]
+        self.sort_key = dict((leaf, key) for key, leaf in entries)
+        self.grid = {}
+        self.cells_of = {}
+        for leaf in self.leaves:
+            leaf.scene = self
+            self.place(leaf)
+        self.hovered = {leaf for leaf in self.leaves if leaf.is_hovered}
+        self.hovered_anywhere = [leaf for leaf in self.leaves if leaf.hover_anywhere]
+        self.indexed = {key: (obj, getattr(obj, 'version', None)) for key, obj in self.items()}
+        self.needs_rebuild = False
+
+    def restack(self, leaf):
+        old = self.sort_key[leaf]
+        i = bisect.bisect_left(self.order, old)
+        del self.order[i]
+        del self.leaves[i]
+
+        # The sequence number stays, so equal z_indexes keep the order they were added in
+        new = self.sort_key[leaf] = (old[0], leaf.z_index, old[2])
+        i = bisect.bisect_left(self.order, new)
+        self.order.insert(i, new)
+        self.leaves.insert(i, leaf)
+
+    def place(self, leaf):
+        for cell in self.cells_of.get(leaf, ()):
+            self.grid[cell].discard(leaf)
+        rect = leaf.rect
+        cells = self.cells_of[leaf] = [
+            (column, row)
+            for column in range(rect.left // CELL_SIZE, (rect.right - 1) // CELL_SIZE + 1)
+            for row in range(rect.top // CELL_SIZE, (rect.bottom - 1) // CELL_SIZE + 1)
+        ]
+        for cell in cells:
+            self.grid.setdefault(cell, set()).add(leaf)
@@ -0,0 +1,133 @@
+"""Headless self-play: python -m simulate --games 100000 --player-1 RandomPlayer --player-2 RandomPlayer"""
+import argparse
+import functools
+import gzip
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import players
+from rules import GameState, PLAY_CARD
+
+MAX_MOVES = 500  # Games that run longer are scored as draws
+CHUNK_SIZE = 250
+
+# winner is 1, 2 or 0 for a draw; values are the six final caravan values, discards the
+# number of discard moves (cards and caravans) made by each player
+GameResult = namedtuple('GameResult', ['game', 'winner', 'moves', 'values', 'discards'])
+
+
+def game_seed(seed, game):
+    # Every game gets its own seed, so results don't depend on how games are split between workers
+    return seed * 1_000_003 + game
+
+
+def play_game(player_1, player_2, seed, game=0, max_moves=MAX_MOVES, decks=(None, None)):
+    rng = random.Random(game_seed(seed, game))
+    random.seed(game_seed(seed, game))  # The players draw from the module-level generator
+    state = GameState.new_game(rng, decks)
+    seats = {1: player_1(player=1), 2: player_2(player=2)}
+    discards = [0, 0]
+    winner = None
+
+    while state.moves < max_moves and winner is None:
+        if not state.legal_moves():
+            break
+        move = seats[state.turn].select_move(state)
+        if move[0] != PLAY_CARD:
+            discards[state.turn - 1] += 1
+        state.apply_move(move)
+        winner = state.winner()
+
+    return GameResult(game, winner or 0, state.moves, tuple(state.values()), tuple(discards))
+
+
+def play_games(player_1, player_2, seed, games, max_moves=MAX_MOVES, decks=(None, None)):
+    return [play_game(player_1, player_2, seed, game, max_moves, decks) for game in games]
+
+
+def run(player_1, player_2, games, seed=0, workers=None, max_moves=MAX_MOVES, decks=(None, None), chunk_size=CHUNK_SIZE):
+    """Yields GameResults as the worker processes finish their chunks (not in game order)."""
+    chunks = [range(start, min(start + chunk_size, games)) for start in range(0, games, chunk_size)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from play_games(player_1, player_2, seed, chunk, max_moves, decks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_games, player_1, player_2, seed, chunk, max_moves, decks) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def wilson_interval(successes, n, z=1.96):
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def write_result(file, result: GameResult):
+    file.write(','.join(map(str, (result.game, result.winner, result.moves, *result.values, *result.discards))) + '\n')
+
+
+def open_output(path):
+    if path is None:
+        return None
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', newline='')
+    return open(path, 'w', newline='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m simulate', description='Plays Caravan games between two players without a window.')
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-1', '--player-1', default='RandomPlayer', help='class name from players.py')
+    parser.add_argument('-2', '--player-2', default='RandomPlayer', help='class name from players.py')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--output', help='CSV file for per-game results, gzipped if it ends with .gz')
+    parser.add_argument('--max-moves', type=int, default=MAX_MOVES)
+    parser.add_argument('--time-budget', type=float, help='seconds per move for the search players')
+    args = parser.parse_args(argv)
+
+    player_1, player_2 = getattr(players, args.player_1), getattr(players, args.player_2)
+    if args.time_budget is not None:
+        player_1, player_2 = (
+            functools.partial(cls, time_budget=args.time_budget) if issubclass(cls, players.SearchPlayer) else cls
+            for cls in (player_1, player_2)
+        )
+    output = open_output(args.output)
+    if output:
+        output.write('game,winner,moves,value_1a,value_1b,value_1c,value_2a,value_2b,value_2c,discards_1,discards_2\n')
+
+    wins = [0, 0, 0]
+    total_moves = 0
+    started = time.perf_counter()
+    try:
+        for result in run(player_1, player_2, args.games, args.seed, args.workers, args.max_moves):
+            wins[result.winner] += 1
+            total_moves += result.moves
+            if output:
+                write_result(output, result)
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - started
+
+    print(f'{args.games} games, {args.player_1} (1) vs {args.player_2} (2), '
+          f'{elapsed:.1f}s, {args.games / elapsed:.0f} games/s, {total_moves / max(args.games, 1):.1f} moves/game')
+    for label, count in (('player 1 wins', wins[1]), ('player 2 wins', wins[2]), ('draws', wins[0])):
+        low, high = wilson_interval(count, args.games)
+        print(f'{label:>14}: {count / max(args.games, 1):6.2%}  95% CI [{low:.2%}, {high:.2%}]')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
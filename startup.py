@@ -0,0 +1,86 @@
+"""Cold start benchmark: python -m startup --runs 5 --output startup.json
+
+Every run is a fresh interpreter, so module imports and asset decoding are paid again as on a kiosk boot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ('interpreter_s', 'import_s', 'init_s', 'menu_s', 'asset_s', 'first_frame_s', 'preload_s')
+
+
+def probe(launched):
+    """Runs in the child: imports the game, opens the window and draws the main menu once."""
+    started = time.time()
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    import pygame
+    import assets
+    import graphics
+    import main
+    from deck_builder import MainMenuState
+    imported = time.time()
+
+    pygame.init()
+    graphics.init()
+    initialized = time.time()
+    state = MainMenuState()
+    preloader = main.preload_game_assets()
+    created = time.time()
+    graphics.display(state)
+    drawn = time.time()
+    preloader.join()
+    preloaded = time.time()
+
+    print(json.dumps({
+        'interpreter_s': started - launched,
+        'import_s': imported - started,
+        'init_s': initialized - imported,
+        'menu_s': created - initialized,
+        'asset_s': assets.stats['decode_time'],  # Decoding only, it's also part of the phases above
+        'first_frame_s': drawn - launched,  # From launching the process to the first frame on screen
+        'preload_s': preloaded - created,  # Until the background thread has decoded the game's images
+        'decodes': assets.stats['decodes'],
+        'modules': sorted(name for name in ('numpy', 'cards', 'decks', 'players', 'rules', 'tweens') if name in sys.modules),
+    }))
+
+
+def run(runs):
+    samples = []
+    for _ in range(runs):
+        launched = time.time()
+        output = subprocess.run([sys.executable, '-m', 'startup', '--probe', repr(launched)],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    results = {phase: statistics.median(sample[phase] for sample in samples) for phase in PHASES}
+    results['decodes'] = samples[-1]['decodes']
+    results['modules'] = samples[-1]['modules']
+    results['runs'] = runs
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m startup', description='Times a cold start up to the first frame of the main menu.')
+    parser.add_argument('-r', '--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help='JSON file for the medians')
+    parser.add_argument('--probe', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.probe is not None:
+        return probe(args.probe)
+    results = run(args.runs)
+    for phase in PHASES:
+        print(f'{phase:>14}: {results[phase] * 1000:7.1f} ms')
+    print(f"{'decodes':>14}: {results['decodes']}, modules loaded: {', '.join(results['modules'])}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
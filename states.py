@@ -2,9 +2,21 @@ from pygame.locals import QUIT, MOUSEBUTTONUP, KEYUP, K_ESCAPE
 import graphics
 from decks import *
 from players import *
+import assets
+from scene import Drawable, Scene
+import rules
 import pygame
 import random
-from itertools import chain
+from tweens import Timeline, Sequence, Parallel, Later, Call, Wait, Move, Flip
+
+BUTTON_PATH = 'assets/images/button.png'
+TRASH_PATH = 'assets/images/trash.png'
+TRASH_OPEN_PATH = 'assets/images/trash_open.png'
+WIN_BANNER_PATH = 'assets/images/win_banner.png'
+LOSE_BANNER_PATH = 'assets/images/lose_banner.png'
+
+MOVE_TIME = 0.55  # Секунды, за которые карта долетает до места
+FLIP_TIME = 0.5  # Секунды на переворот карты
 
 class Context:
     def __init__(self, initial_state=None):
@@ -15,16 +27,19 @@ class Context:
             self.state = MainMenuState()
 
     def handle_events(self):
-        self.state = self.state.handle_events()
+        state = self.state.handle_events()
+        if state.objects is not self.state.objects:
+            self.state.objects.detach()  # Карты старого состояния больше не сообщают ему о своих перемещениях
+        self.state = state
 
     def is_running(self):
         return self.state.is_running()
 
 
 class State:
-    def __init__(self, objects=None, animations=None, transition=False):
-        self.objects: dict[str, Button | Card | Deck | Caravan] = objects if objects else {}
-        self.animations: list = animations if animations else []
+    def __init__(self, objects=None, timeline=None, transition=False):
+        self.objects: Scene = objects if isinstance(objects, Scene) else Scene(objects)
+        self.timeline: Timeline = timeline or Timeline()
         self.transition = transition
 
     def handle_events(self):
@@ -35,11 +50,10 @@ class State:
 
 
 class StandardMode(State):
-    def __init__(self, starting_cards=None, objects=None, animations=None, transition=False):
-        super().__init__(objects, animations, transition)
+    def __init__(self, starting_cards=None, objects=None, timeline=None, transition=False):
+        super().__init__(objects, timeline, transition)
 
         self.starting_cards = starting_cards
-        self.objects['anonymous_button'] = Button(0, 0, 0, 0, is_visible=False)
         # Инициализация караванов
         self.objects['player_1_caravan_A'] = Caravan(player=1, caravan='A')
         self.objects['player_1_caravan_B'] = Caravan(player=1, caravan='B')
@@ -84,11 +98,12 @@ class StandardMode(State):
             'counter_2_caravan_B',
             'counter_2_caravan_C',
         ]
+        self.counter_values = [0] * len(self.counter_names)
 
         self.objects['go_back_button'] = Button(10, WINDOW_HEIGHT - 69, 128, 64, text='Выход')
 
-        closed_trash_image = pygame.transform.scale(pygame.image.load('assets/images/trash.png'), (96, 96))
-        opened_trash_image = pygame.transform.scale(pygame.image.load('assets/images/trash_open.png'), (96, 96))
+        closed_trash_image = assets.image(TRASH_PATH, (96, 96))
+        opened_trash_image = assets.image(TRASH_OPEN_PATH, (96, 96))
         self.objects['trash_button'] = Trash(
             WINDOW_WIDTH - 96, WINDOW_HEIGHT - 96, 96, 96, original_image=closed_trash_image, hovered_image=opened_trash_image
         )
@@ -107,25 +122,32 @@ class StandardMode(State):
         self.player_1_turn = True
         self.player_1_beginning_phase_counter = 3  # Начальная фаза: игрок должен положить по одной карте в каждый караван
         self.player_2 = RandomPlayer()
+        self.moves = 0
 
-        self.animation_cooldown = False
-        self.animations.append(self.animation_cooldown_handler())
+        self.timeline.finished.connect(self.on_animations_finished)
+
+    @property
+    def animation_cooldown(self):
+        return self.timeline.is_running
 
     def handle_events(self):
         if _check_for_quit():
-            return Quit(objects=self.objects, animations=self.animations)
+            return Quit(objects=self.objects, timeline=self.timeline)
 
         previously_selected = None
         currently_selected = None
 
-        # Обновление счётчиков стоимости караванов
-        for counter_name, caravan_name in zip(self.counter_names, self.caravan_names):
-            self.objects[counter_name].text = f'{self.objects[caravan_name].calculate_value()}'
+        # Обновление счётчиков стоимости караванов (только если стоимость изменилась)
+        for i, (counter_name, caravan_name) in enumerate(zip(self.counter_names, self.caravan_names)):
+            value = self.objects[caravan_name].value
+            if value != self.counter_values[i]:
+                self.counter_values[i] = value
+                self.objects[counter_name].text = f'{value}'
 
         # Обработка наведения мыши
         x, y = pygame.mouse.get_pos()
+        self.objects.hover(x, y)
         for value in self.objects.values():
-            value.hover(x, y)
             if value.check_if_selected():
                 previously_selected = value.get_selected()
 
@@ -144,7 +166,7 @@ class StandardMode(State):
             return WinState(
                 winner=player,
                 objects=self.objects,
-                animations=self.animations
+                timeline=self.timeline
             )
 
         # Ход игрока 1: обработка карты из руки
@@ -153,18 +175,18 @@ class StandardMode(State):
             # Сброс карты
             if currently_selected == self.objects['trash_button'] and self.player_1_beginning_phase_counter == 0:
                 self.player_1_turn = False
+                self.moves += 1
                 player_1_playing_deck.remove_card(previously_selected)
-                self.animations.append(self.respace_player_hand_animation(PlayingDeck(cards=player_1_playing_deck.cards[:])))
+                self.timeline.add(self.respace_player_hand_animation(player_1_playing_deck.cards[:], 1))
 
-                player_1_playing_deck.add_card(self.objects['drawing_deck'].cards[0])
-                self.objects['drawing_deck'].cards.pop(0)
-                self.animations.append(
-                    chain(
-                        self.translate_card_animation(previously_selected, -200, random.randint(0, WINDOW_HEIGHT), -500),
+                player_1_playing_deck.add_card(top_card := self.objects['drawing_deck'].draw())
+                self.timeline.add(
+                    Sequence(
+                        self.discard_card_animation(previously_selected),
                         self.wait_animation(.2),
                         self.flip_over_card_animation(player_1_playing_deck.cards[-1]),
                         self.wait_animation(.2),
-                        self.respace_player_hand_animation(player_1_playing_deck)
+                        self.respace_player_hand_animation(player_1_playing_deck.cards, 1)
                     )
                 )
                 return self
@@ -189,46 +211,46 @@ class StandardMode(State):
                                 self.player_1_beginning_phase_counter = max(self.player_1_beginning_phase_counter - 1, 0)
                                 print(f"Beginning phase counter decreased to {self.player_1_beginning_phase_counter}")
                         self.player_1_turn = False
+                        self.moves += 1
                         player_1_playing_deck.remove_card(previously_selected)
                         self.objects[at_deck].add_card_on(previously_selected, currently_selected)
                         currently_selected.is_selected = False
                         if previously_selected.rank not in [RANK_J, RANK_JOKER]:
-                            self.animations.append(chain(
+                            animation = Sequence(
                                 self.translate_card_on_top_of_card_animation(previously_selected, currently_selected, self.objects[at_deck]),
                                 self.remove_outline_card_of_caravan(self.objects[at_deck])
-                            ))
+                            )
                         elif previously_selected.rank == RANK_J:
-                            self.animations.append(chain(
+                            animation = Sequence(
                                 self.translate_card_on_top_of_card_animation(previously_selected, currently_selected, self.objects[at_deck]),
                                 self.remove_outline_card_of_caravan(self.objects[at_deck]),
                                 self.wait_animation(.2),
                                 self.activate_jack_card_animation(previously_selected, currently_selected, self.objects[at_deck]),
                                 self.wait_animation(.5),
                                 self.readjust_caravan_animation(self.objects[at_deck])
-                            ))
+                            )
                         else:
-                            self.animations.append(chain(
+                            animation = Sequence(
                                 self.translate_card_on_top_of_card_animation(previously_selected, currently_selected, self.objects[at_deck]),
                                 self.remove_outline_card_of_caravan(self.objects[at_deck]),
                                 self.wait_animation(.2),
                                 self.activate_joker_card_animation(previously_selected, currently_selected, [self.objects[name] for name in self.caravan_names]),
                                 self.wait_animation(.5),
                                 self.readjust_caravans_animation([self.objects[name] for name in self.caravan_names])
-                            ))
+                            )
                         if len(player_1_playing_deck.cards) < 5:
-                            player_1_playing_deck.add_card(top_card := self.objects['drawing_deck'].cards[0])
-                            self.objects['drawing_deck'].remove_card(top_card)
-                            last_animation = self.animations.pop()
-                            self.animations.append(self.respace_player_hand_animation(PlayingDeck(cards=player_1_playing_deck.cards[:-1])))
-                            self.animations.append(chain(
-                                last_animation,
+                            player_1_playing_deck.add_card(top_card := self.objects['drawing_deck'].draw())
+                            self.timeline.add(self.respace_player_hand_animation(player_1_playing_deck.cards[:-1], 1))
+                            self.timeline.add(Sequence(
+                                animation,
                                 self.wait_animation(.2),
                                 self.flip_over_card_animation(top_card),
                                 self.wait_animation(.2),
-                                self.respace_player_hand_animation(player_1_playing_deck)
+                                self.respace_player_hand_animation(player_1_playing_deck.cards, 1)
                             ))
                         else:
-                            self.animations.append(self.respace_player_hand_animation(player_1_playing_deck))
+                            self.timeline.add(animation)
+                            self.timeline.add(self.respace_player_hand_animation(player_1_playing_deck.cards, 1))
                         return self
                     else:
                         print(f"Move is not valid for {at_deck}")
@@ -239,51 +261,52 @@ class StandardMode(State):
         if any(self.objects[name].contains(previously_selected) for name in self.caravan_names[:3]) and self.player_1_turn and not self.animation_cooldown:
             if currently_selected == self.objects['trash_button'] and self.player_1_beginning_phase_counter == 0:
                 self.player_1_turn = False
+                self.moves += 1
                 caravan = None
                 for deck in [self.objects[name] for name in self.caravan_names[:3]]:
                     if deck.contains(previously_selected):
                         caravan = deck
                         break
-                for i, card in enumerate(caravan.cards[1:]):
+                for card in caravan.cards[1:]:
                     caravan.remove_card(card)
-                    self.animations.append(self.translate_card_animation(card, -200, random.randint(0, WINDOW_HEIGHT), -500, at_deck=f'anonymous_card_{i}'))
+                    self.timeline.add(self.discard_card_animation(card))
                 return self
 
         # Ход игрока 2 (ИИ)
         if not self.player_1_turn and not self.animation_cooldown:
             self.player_1_turn = True
+            self.moves += 1
             move_type, move = self.player_2.select_next_move(self.objects['player_2_playing_deck'], [self.objects[name] for name in self.caravan_names])
             if move_type == DISCARD_CARD:
                 card = move
                 self.objects['player_2_playing_deck'].remove_card(card)
-                self.objects['player_2_playing_deck'].add_card(top_deck_card := self.objects['drawing_deck_2'].cards[0])
-                self.objects['drawing_deck_2'].remove_card(top_deck_card)
-                self.animations.append(chain(
+                self.objects['player_2_playing_deck'].add_card(top_deck_card := self.objects['drawing_deck_2'].draw())
+                self.timeline.add(Sequence(
                     self.flip_over_card_animation(card),
                     self.wait_animation(.2),
-                    self.translate_card_animation(card, -200, random.randint(0, WINDOW_HEIGHT), -500),
+                    self.discard_card_animation(card),
                     self.wait_animation(.2),
-                    self.respace_player_hand_animation(self.objects['player_2_playing_deck'], player=2),
+                    self.respace_player_hand_animation(self.objects['player_2_playing_deck'].cards, 2),
                     self.wait_animation(.2)
                 ))
             elif move_type == DISCARD_CARAVAN:
                 caravan = move
-                for i, card in enumerate(caravan.cards[1:]):
+                for card in caravan.cards[1:]:
                     caravan.remove_card(card)
-                    self.animations.append(self.translate_card_animation(card, -200, random.randint(0, WINDOW_HEIGHT), -500, at_deck=f'anonymous_card_{i}'))
+                    self.timeline.add(self.discard_card_animation(card))
             else:
                 card, on_top_of_card, caravan = move
                 self.objects['player_2_playing_deck'].remove_card(card)
                 caravan.add_card_on(card, on_top_of_card)
                 if card.rank not in [RANK_J, RANK_JOKER]:
-                    self.animations.append(chain(
+                    animation = Sequence(
                         self.flip_over_card_animation(card),
                         self.wait_animation(.2),
                         self.translate_card_on_top_of_card_animation(card, on_top_of_card, caravan),
                         self.remove_outline_card_of_caravan(caravan)
-                    ))
+                    )
                 elif card.rank == RANK_J:
-                    self.animations.append(chain(
+                    animation = Sequence(
                         self.flip_over_card_animation(card),
                         self.wait_animation(.2),
                         self.translate_card_on_top_of_card_animation(card, on_top_of_card, caravan),
@@ -292,9 +315,9 @@ class StandardMode(State):
                         self.activate_jack_card_animation(card, on_top_of_card, caravan),
                         self.wait_animation(.5),
                         self.readjust_caravan_animation(caravan)
-                    ))
+                    )
                 else:
-                    self.animations.append(chain(
+                    animation = Sequence(
                         self.flip_over_card_animation(card),
                         self.wait_animation(.2),
                         self.translate_card_on_top_of_card_animation(card, on_top_of_card, caravan),
@@ -303,123 +326,94 @@ class StandardMode(State):
                         self.activate_joker_card_animation(card, on_top_of_card, [self.objects[name] for name in self.caravan_names]),
                         self.wait_animation(.5),
                         self.readjust_caravans_animation([self.objects[name] for name in self.caravan_names])
-                    ))
+                    )
                 player_2_playing_deck = self.objects['player_2_playing_deck']
                 if len(player_2_playing_deck.cards) < 5:
-                    player_2_playing_deck.add_card(top_card := self.objects['drawing_deck_2'].cards[0])
-                    self.objects['drawing_deck_2'].remove_card(top_card)
-                    last_animation = self.animations.pop()
-                    self.animations.append(self.respace_player_hand_animation(PlayingDeck(cards=player_2_playing_deck.cards[:-1], player=2), player=2))
-                    self.animations.append(chain(
-                        last_animation,
+                    player_2_playing_deck.add_card(top_card := self.objects['drawing_deck_2'].draw())
+                    self.timeline.add(self.respace_player_hand_animation(player_2_playing_deck.cards[:-1], 2))
+                    self.timeline.add(Sequence(
+                        animation,
                         self.wait_animation(.2),
-                        self.respace_player_hand_animation(player_2_playing_deck, player=2)
+                        self.respace_player_hand_animation(player_2_playing_deck.cards, 2)
                     ))
                 else:
-                    self.animations.append(self.respace_player_hand_animation(player_2_playing_deck, player=2))
+                    self.timeline.add(animation)
+                    self.timeline.add(self.respace_player_hand_animation(player_2_playing_deck.cards, 2))
 
         if (player := self.check_winning_condition()) is not None:
             return WinState(
                 winner=player,
                 objects=self.objects,
-                animations=self.animations
+                timeline=self.timeline
             )
 
         return self
 
-    def translate_card_animation(self, card, cx, cy, angle, at_deck='anonymous_card'):
-        curr_x, curr_y = card.center
-        curr_angle = card.angle
-        animation_speed = 45
-        for t in range(animation_speed):
-            offset_x = curr_x + (cx - curr_x) * t / (animation_speed - 1)
-            offset_y = curr_y + (cy - curr_y) * t / (animation_speed - 1)
-            offset_angle = curr_angle + (angle - curr_angle) * t / (animation_speed - 1)
-            card.set_at(offset_x, offset_y, offset_angle)
-            yield {at_deck: card}
+    def translate_card_animation(self, card, cx, cy, angle):
+        # Карта может уже не лежать ни в одной колоде (сброс), тогда её рисует сцена
+        return Sequence(Call(self.objects.add_transient, card), Move(card, cx, cy, angle, MOVE_TIME))
+
+    def discard_card_animation(self, card):
+        # Карта улетает за левый край экрана
+        return self.translate_card_animation(card, -200, random.randint(0, WINDOW_HEIGHT), -500)
 
     def flip_over_card_animation(self, card):
-        curr_image = card.get_image()
-        image_w, image_h = curr_image.get_size()
-        animation_speed = 20
-        for ts in [range(animation_speed), range(animation_speed, -1, -1)]:
-            for t in ts:
-                offset_image_w = image_w * (1 - t / animation_speed)
-                offset_image_h = image_h * (1 + 0.2 * t / animation_speed)
-                offset_image = pygame.transform.scale(curr_image, (offset_image_w, offset_image_h))
-                card.z_index = 100
-                card.set_image(offset_image)
-                yield {'anonymous_card': card}
-            if ts == range(animation_speed, -1, -1):
-                continue
-            card.is_flipped = not card.is_flipped
-            card.set_at(*card.center, -card.angle)
-            curr_image = card.get_image()
-
-    def respace_player_hand_animation(self, deck, player=1):
-        positions = list(deck.respace_cards_positions())
-        old_positions = [(*card.center, card.angle) for card in deck.cards]
-        animation_speed = 45
-        for t in range(animation_speed):
-            cards = []
-            for i, (card, (x, y, angle), (curr_x, curr_y, curr_angle)) in enumerate(zip(deck.cards, positions, old_positions)):
-                offset_x = curr_x + (x - curr_x) * t / (animation_speed - 1)
-                offset_y = curr_y + (y - curr_y) * t / (animation_speed - 1)
-                offset_angle = curr_angle + (angle - curr_angle) * t / (animation_speed - 1)
-                card.set_at(offset_x, offset_y, offset_angle)
+        # Кадры сжатия одни и те же для каждой стороны карты и угла, они берутся из кэша
+        return Sequence(Call(self.objects.add_transient, card), Flip(card, FLIP_TIME))
+
+    def respace_player_hand_animation(self, cards, player):
+        # Позиции считаются в момент старта, когда предыдущие анимации уже закончились.
+        # cards – список карт руки: сама рука (её список меняется на месте) или снимок её части
+        def respace():
+            moves = []
+            for i, (card, (x, y, angle)) in enumerate(zip(cards, generate_hand_card_positions(player, len(cards)))):
                 card.z_index = i
-                cards.append(card)
-            yield {f'player_{player}_playing_deck': PlayingDeck(cards=cards, player=player)}
+                moves.append(Move(card, x, y, angle, MOVE_TIME))
+            return Parallel(*moves)
+        return Later(respace)
 
     def wait_animation(self, seconds):
-        for t in range(int(graphics.FPS * seconds)):
-            yield {'anonymous_button': self.objects['anonymous_button']}
+        return Wait(seconds)
 
     def translate_card_on_top_of_card_animation(self, card, on_top_of_card, deck):
         angle = random.randint(-5, 0)
         if deck.cards[0] == on_top_of_card:
             return self.translate_card_animation(card, *on_top_of_card.center, angle)
+        layer_card, adjacents = deck.layers[deck.find_layer(on_top_of_card)]
         if card.is_numerical():
-            for layer_card, adjacents in deck.layers:
-                if layer_card == on_top_of_card or on_top_of_card in adjacents:
-                    return self.translate_card_animation(card, layer_card.center[0], layer_card.center[1] + 40, angle)
+            return self.translate_card_animation(card, layer_card.center[0], layer_card.center[1] + 40, angle)
         if card.is_face():
-            for layer_card, adjacents in deck.layers:
-                if layer_card == on_top_of_card or on_top_of_card in adjacents:
-                    offset_x = len(adjacents) * 20
-                    return self.translate_card_animation(card, layer_card.center[0] + offset_x, layer_card.center[1], angle)
+            offset_x = len(adjacents) * 20
+            return self.translate_card_animation(card, layer_card.center[0] + offset_x, layer_card.center[1], angle)
 
     def remove_outline_card_of_caravan(self, deck):
-        if 'Placeholder' in str(type(deck.cards[0])):
-            deck.cards[0].is_visible = False
-        yield {'anonymous_button': self.objects['anonymous_button']}
+        def remove_outline():
+            if 'Placeholder' in str(type(deck.cards[0])):
+                deck.cards[0].is_visible = False
+        return Call(remove_outline)
 
     def activate_jack_card_animation(self, card, on_top_of_card, deck):
-        layer_card, adjacents = None, None
-        for layer_card, adjacents in deck.layers:
-            if on_top_of_card == layer_card or on_top_of_card in adjacents:
-                break
-        deck.remove_card(layer_card)
-        cards = [card, layer_card, *adjacents]
-        for i, c in enumerate(cards):
-            self.animations.append(self.translate_card_animation(c, -200, random.randint(0, WINDOW_HEIGHT), -500, at_deck=f'anonymous_card_{i}'))
-        yield {f'anonymous_card_{i}': c for i, c in enumerate(cards)}
+        def activate():
+            layer_card, adjacents = deck.layers[deck.find_layer(on_top_of_card)]
+            deck.remove_card(layer_card)
+            for c in [card, layer_card, *adjacents]:
+                self.objects.add_transient(c)
+                self.timeline.add(self.discard_card_animation(c))
+        return Call(activate)
 
     def readjust_caravan_animation(self, deck: Caravan):
-        starting_x = {1: 200, 2: 100}
-        starting_y = {1: 290, 2: 90}
-        offset_x = {'A': 0, 'B': 200, 'C': 400}
-
-        player = deck.player
-        caravan = deck.caravan
-
-        for i, (layer_card, adjacents) in enumerate(deck.layers):
-            layer_card: Card
-            self.animations.append(self.translate_card_animation(layer_card, starting_x[player] + offset_x[caravan], starting_y[player] + 40 * i, layer_card.angle, at_deck=f'{str(deck)}_anonymous_card_{i}'))
-            for j, adj in enumerate(adjacents):
-                adj: Card
-                self.animations.append(self.translate_card_animation(adj, starting_x[player] + offset_x[caravan] + 20 * (j + 1), starting_y[player] + 40 * i, adj.angle, at_deck=f'{str(deck)}_anonymous_card__{i}_{j}'))
-        yield {'anonymous_button': self.objects['anonymous_button']}
+        def readjust():
+            player = deck.player
+            caravan = deck.caravan
+            moves = []
+            for i, (layer_card, adjacents) in enumerate(deck.layers):
+                layer_card: Card
+                moves.append(self.translate_card_animation(layer_card, *caravan_card_position(player, caravan, i), layer_card.angle))
+                for j, adj in enumerate(adjacents):
+                    adj: Card
+                    moves.append(self.translate_card_animation(adj, *caravan_card_position(player, caravan, i, j + 1), adj.angle))
+            return Parallel(*moves)
+        return Later(readjust)
 
     def activate_joker_card_animation(self, joker, on_top_of_card, decks: list[Caravan]):
         """
@@ -428,100 +422,84 @@ class StandardMode(State):
         decks – все 6 караванов
         """
 
-        # 1. понимаем, какие карты нужно убрать
-        if on_top_of_card.rank == RANK_A:  # режим «по масти»
-            def must_remove(card):
-                return (card.is_numerical()  # только 2-10
-                        and card.rank != RANK_A
-                        and card.suit == on_top_of_card.suit)
-        else:  # режим «по значению»
-            target_rank = on_top_of_card.rank
-
-            def must_remove(card):
-                return (card.is_numerical()
-                        and card.rank == target_rank
-                        and card is not on_top_of_card)  # свой «хозяин» не трогаем
-
-        # 2. собираем жертвы (числовая + все прикреплённые к ней картинки)
-        victims: list[Card] = []
-        for deck in decks:
-            # делаем копию итерации, т.к. будем модифицировать layers
-            for layer_card, adjacents in deck.layers[:]:
-                if must_remove(layer_card):
-                    deck.remove_card(layer_card)  # правит value/suit/direction
-                    victims.append(layer_card)
-                    victims.extend(adjacents)
-
-        # 3. красиво улетаем за экран
-        for i, c in enumerate(victims):
-            self.animations.append(
-                self.translate_card_animation(
-                    c, -200, random.randint(0, WINDOW_HEIGHT), -500,
-                    at_deck=f'anonymous_card_{i}'
-                )
-            )
-
-        # 4. отдаём генератору фиктивный кадр, чтобы анимации попали в очередь
-        yield {'anonymous_button': self.objects['anonymous_button'],
-               **{f'anonymous_card_{i}': c for i, c in enumerate(victims)}}
+        def activate():
+            # 1. жертв находят правила: у каждого каравана есть битовое множество его числовых карт
+            caravans = [deck.state for deck in decks]
+            caravan_index = next(i for i, deck in enumerate(decks) if deck.contains(on_top_of_card))
+            layer = decks[caravan_index].find_layer(on_top_of_card)
+            layer_card, adjacents = decks[caravan_index].layers[layer]
+            slot = 0 if on_top_of_card is layer_card else adjacents.index(on_top_of_card) + 1
+
+            # 2. снимаем жертвы (числовая + все прикреплённые к ней картинки), по разу на караван
+            victims: list[Card] = []
+            for i, layers in rules.joker_victims(caravans, caravan_index, layer, slot).items():
+                victims += decks[i].remove_layers(layers)  # правит value/suit/direction
+
+            # 3. красиво улетаем за экран
+            for c in victims:
+                self.objects.add_transient(c)
+                self.timeline.add(self.discard_card_animation(c))
+        return Call(activate)
 
     def readjust_caravans_animation(self, decks):
-        for deck in decks:
-            self.animations.append(self.readjust_caravan_animation(deck))
-        yield {'anonymous_button': self.objects['anonymous_button']}
-
-    def animation_cooldown_handler(self):
-        while True:
-            self.animation_cooldown = True
-            if len(self.animations) == 1:
-                self.animation_cooldown = False
-                for key in list(self.objects.keys()):
-                    if 'anonymous' in key and 'button' not in key:
-                        del self.objects[key]
-                for name in self.caravan_names:
-                    self.objects[name].update()
-            yield {'anonymous_button': self.objects['anonymous_button']}
+        return Parallel(*(self.readjust_caravan_animation(deck) for deck in decks))
+
+    def on_animations_finished(self):
+        # Все анимации доиграли: улетевшие карты больше не рисуются, караваны пересобираются
+        self.objects.clear_transient()
+        for name in self.caravan_names:
+            self.objects[name].update()
 
     def check_winning_condition(self):
         """Возвращает 1, 2 или None (игра продолжается) по официальным правилам Fallout: New Vegas."""
 
-        p1_caravans = [self.objects[name] for name in self.caravan_names[:3]]
-        p2_caravans = [self.objects[name] for name in self.caravan_names[3:]]
-
-        p1_values = [c.calculate_value() for c in p1_caravans]
-        p2_values = [c.calculate_value() for c in p2_caravans]
-
-        p1_wins = 0
-        p2_wins = 0
-        draws = 0
-
-        for v1, v2 in zip(p1_values, p2_values):
-            in_range1 = 21 <= v1 <= 26
-            in_range2 = 21 <= v2 <= 26
-
-            if in_range1 and not in_range2:
-                p1_wins += 1
-            elif in_range2 and not in_range1:
-                p2_wins += 1
-            elif in_range1 and in_range2:
-                if v1 > v2:
-                    p1_wins += 1
-                elif v2 > v1:
-                    p2_wins += 1
-                else:
-                    draws += 1  # ничья
-
-        if p1_wins >= 2:
-            return 1
-        if p2_wins >= 2:
-            return 2
-
-        # если у обоих игроков по два проданных каравана
-        if p1_wins + draws >= 2 and p2_wins + draws >= 2:
-            # ничья по проданным караванам — продолжаем игру
-            return None
+        return rules.winner([self.objects[name].value for name in self.caravan_names])
+
+    def to_game_state(self):
+        """Снимок партии в виде rules.GameState (для поиска, симуляций и упаковки)."""
+        return rules.GameState(
+            caravans=[self.objects[name].state.copy() for name in self.caravan_names],
+            hands=[[card.id for card in self.objects[f'player_{p}_playing_deck'].cards] for p in (1, 2)],
+            decks=[[card.id for card in reversed(self.objects[name].cards)] for name in ('drawing_deck', 'drawing_deck_2')],
+            turn=1 if self.player_1_turn else 2,
+            opening=[self.player_1_beginning_phase_counter, self.player_2.beginning_phase_counter],
+            moves=self.moves
+        )
 
-        return None
+    def load_game_state(self, state: rules.GameState):
+        """Раскладывает rules.GameState по объектам на столе, обратное к to_game_state."""
+        deck_names = ['player_1_playing_deck', 'player_2_playing_deck', 'drawing_deck', 'drawing_deck_2']
+        pool = {}
+        for name in self.caravan_names + deck_names:
+            cards = self.objects[name].cards
+            for card in cards[1:] if name in self.caravan_names else cards:
+                pool.setdefault(card.id, []).append(card)
+
+        def take(card_id):
+            card = pool[card_id].pop() if pool.get(card_id) else Card(rules.RANK_OF[card_id], rules.SUIT_OF[card_id])
+            card.is_visible = True
+            card.is_hoverable = True
+            card.is_hovered = False
+            card.is_selected = False
+            return card
+
+        for name, caravan_state in zip(self.caravan_names, state.caravans):
+            self.objects[name].load_state(caravan_state, take)
+
+        hand_1 = [take(card_id) for card_id in state.hands[0]]
+        hand_2 = [take(card_id) for card_id in state.hands[1]]
+        self.objects['player_1_playing_deck'].replace_cards(generate_player_1_hand_cards(len(hand_1), cards=hand_1) if hand_1 else [])
+        self.objects['player_2_playing_deck'].replace_cards(generate_player_2_hand_cards(len(hand_2), cards=hand_2) if hand_2 else [])
+        drawing_1 = [take(card_id) for card_id in reversed(state.decks[0])]
+        drawing_2 = [take(card_id) for card_id in reversed(state.decks[1])]
+        self.objects['drawing_deck'].replace_cards(generate_drawing_deck_1_cards(len(drawing_1), cards=drawing_1) if drawing_1 else [])
+        self.objects['drawing_deck_2'].replace_cards(generate_drawing_deck_2_cards(len(drawing_2), cards=drawing_2) if drawing_2 else [])
+
+        self.player_1_turn = state.turn == 1
+        self.player_1_beginning_phase_counter = state.opening[0]
+        self.player_2.beginning_phase_counter = state.opening[1]
+        self.moves = state.moves
+        self.on_animations_finished()
 
     def _compare(self, p1, p2):
         # Ничья по какому-либо каравану — продолжаем
@@ -539,8 +517,8 @@ class StandardMode(State):
         return 1 if p1_wins >= 2 else 2
 
 class Quit(State):
-    def __init__(self, objects=None, animations=None, transition=False):
-        super().__init__(objects, animations, transition)
+    def __init__(self, objects=None, timeline=None, transition=False):
+        super().__init__(objects, timeline, transition)
 
     def handle_events(self):
         raise NotImplemented('Quit state should not be handling events.')
@@ -559,16 +537,18 @@ def _check_for_quit():
     return False
 
 
-class Button:
+class Button(Drawable):
+    hover_anywhere = True  # hover() also resets the font color (and Trash its selection)
+
     def __init__(self, left, top, width, height, center_x=None, center_y=None, text='', is_clickable=True,
                  is_hovered=False, is_visible=True, z_index=0, is_hoverable=True, font_size=40, font_color=(0, 0, 0), color=(255, 255, 255, 255),
                  original_image=None, hovered_image=None):
+        # Images are shared between buttons (see assets.image), so they're never drawn on
         if original_image:
             self.original_image = original_image
-            self.image = original_image.copy()
         else:
-            self.original_image = pygame.transform.scale(pygame.image.load('assets/images/button.png'), (width, height)).convert_alpha()
-            self.image = pygame.transform.scale(pygame.image.load('assets/images/button.png'), (width, height)).convert_alpha()
+            self.original_image = assets.image(BUTTON_PATH, (width, height))
+        self.image = self.original_image
 
         self.rect = pygame.Rect(left, top, width, height)
         if center_x and center_y:
@@ -582,7 +562,7 @@ class Button:
         if hovered_image:
             self.hovered_image = hovered_image
         else:
-            self.hovered_image = self.image.copy()
+            self.hovered_image = self.image
 
         self.is_clickable = is_clickable
         self.is_hoverable = is_hoverable
@@ -669,22 +649,17 @@ class WinState(State):
             left=WINDOW_WIDTH // 2 - 64, top=WINDOW_HEIGHT // 2 + 50,
             width=128, height=64, text='Выход'
         )
-        self.banner = pygame.image.load(
-            'assets/images/win_banner.png' if winner == 1
-            else 'assets/images/lose_banner.png'
-        ).convert_alpha()
+        path = WIN_BANNER_PATH if winner == 1 else LOSE_BANNER_PATH
+        self.banner = assets.image(path)
         # масштабируем по ширине окна (не обязательно)
         bw, bh = self.banner.get_size()
         if bw > WINDOW_WIDTH * 0.8:
             ratio = (WINDOW_WIDTH * 0.8) / bw
-            self.banner = pygame.transform.smoothscale(
-                self.banner, (int(bw * ratio), int(bh * ratio))
-            )
+            self.banner = assets.image(path, (int(bw * ratio), int(bh * ratio)), assets.SMOOTHSCALE)
 
     def handle_events(self):
         x, y = pygame.mouse.get_pos()
-        for obj in self.objects.values():
-            obj.hover(x, y)
+        self.objects.hover(x, y)
 
         for event in pygame.event.get(MOUSEBUTTONUP):
             x, y = event.pos
@@ -0,0 +1,10 @@
+from deck_optimizer import DeckOptimizer, is_playable
+
+POOL = list(range(40))
+
+
+def test_optimize_takes_several_steps_within_budget():
+    optimizer = DeckOptimizer(POOL, deck_size=30, time_budget=2.0, workers=2, seed=1)
+    deck = optimizer.optimize()
+    assert optimizer.steps > 1
+    assert len(deck) == 30 and set(deck) <= set(POOL) and is_playable(deck)
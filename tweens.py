@@ -0,0 +1,196 @@
+"""Time-based animations: tweens advance by the seconds that passed, not by rendered frames."""
+import assets
+
+MAX_STEP = 0.25  # Longer frames (a stall, a dragged window) only advance the animations this far
+
+
+def linear(t):
+    return t
+
+
+def ease_in_out(t):
+    return t * t * (3 - 2 * t)
+
+
+def ease_out(t):
+    return 1 - (1 - t) ** 3
+
+
+class Signal:
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def emit(self, *args):
+        for callback in self.callbacks:
+            callback(*args)
+
+
+class Tween:
+    """Base of all animations: advance() plays `dt` more seconds of it and returns None while it's
+    still running, or the part of `dt` left over once it's done, so whatever follows starts on time."""
+
+    def advance(self, timeline, dt):
+        raise NotImplementedError
+
+
+class Wait(Tween):
+    def __init__(self, duration):
+        self.duration = duration
+        self.elapsed = 0.0
+
+    def advance(self, timeline, dt):
+        self.elapsed += dt
+        return self.elapsed - self.duration if self.elapsed >= self.duration else None
+
+
+class Call(Tween):
+    """Runs `function` once, taking no time."""
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def advance(self, timeline, dt):
+        self.function(*self.args)
+        return dt
+
+
+class Later(Tween):
+    """A tween built by `factory` when it starts, for animations that depend on where things are by then."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.tween = None
+
+    def advance(self, timeline, dt):
+        if self.tween is None:
+            self.tween = self.factory()
+        return self.tween.advance(timeline, dt)
+
+
+class Sequence(Tween):
+    def __init__(self, *tweens):
+        self.tweens = list(tweens)
+        self.current = 0
+
+    def advance(self, timeline, dt):
+        while self.current < len(self.tweens):
+            dt = self.tweens[self.current].advance(timeline, dt)
+            if dt is None:
+                return None
+            self.current += 1
+        return dt
+
+
+class Parallel(Tween):
+    def __init__(self, *tweens):
+        self.tweens = list(tweens)
+        self.left = [None] * len(self.tweens)  # Time since each tween finished
+
+    def advance(self, timeline, dt):
+        for i, tween in enumerate(self.tweens):
+            self.left[i] = tween.advance(timeline, dt) if self.left[i] is None else self.left[i] + dt
+        if any(left is None for left in self.left):
+            return None
+        return min(self.left, default=dt)
+
+
+class Move(Tween):
+    """Moves a card from wherever it is when the tween starts to (x, y, angle)."""
+
+    def __init__(self, card, x, y, angle, duration, ease=ease_in_out):
+        self.card = card
+        self.end = (x, y, angle)
+        self.duration = duration
+        self.ease = ease
+        self.start = None
+        self.elapsed = 0.0
+
+    def advance(self, timeline, dt):
+        if self.start is None:
+            self.start = (*self.card.center, self.card.angle)
+        self.elapsed += dt
+        if self.elapsed >= self.duration:
+            # Finished moves are placed right away, so a move that follows starts from here
+            self.card.set_at(*self.end)
+            return self.elapsed - self.duration
+        timeline.moves.append(self)
+        return None
+
+
+class Flip(Tween):
+    """Squashes a card edge-on, turns it over and stretches it back, from cached frames."""
+
+    def __init__(self, card, duration, steps=20):
+        self.card = card
+        self.duration = duration
+        self.steps = steps
+        self.image = None
+        self.frames = None
+        self.turned = False
+        self.elapsed = 0.0
+
+    def advance(self, timeline, dt):
+        card = self.card
+        if self.frames is None:
+            self.image = card.get_image()
+            self.frames = assets.flip_frames(self.image, self.steps)
+        self.elapsed += dt
+        half = self.duration / 2
+        if not self.turned and self.elapsed >= half:
+            card.is_flipped = not card.is_flipped
+            card.set_at(*card.center, -card.angle)
+            self.image = card.get_image()
+            self.frames = assets.flip_frames(self.image, self.steps)
+            self.turned = True
+
+        card.z_index = 100
+        if self.elapsed >= self.duration:
+            card.set_image(self.image)
+            return self.elapsed - self.duration
+        squash = self.elapsed / half if not self.turned else 2 - self.elapsed / half
+        card.set_image(self.frames[round(squash * self.steps)])
+        return None
+
+
+class Timeline:
+    """Plays tweens in parallel, moving all cards in one batched step per update."""
+
+    def __init__(self):
+        self.running: list[Tween] = []
+        self.moves: list[Move] = []  # Moves still under way in the current update
+        self.finished = Signal()  # Emitted when the last running tween ends
+
+    @property
+    def is_running(self):
+        return bool(self.running)
+
+    def add(self, tween):
+        self.running.append(tween)
+
+    def update(self, dt):
+        if not self.running:
+            return
+        dt = min(dt, MAX_STEP)
+        # Tweens added while this runs (by a Call) start with the next update
+        for tween in self.running[:]:
+            if tween.advance(self, dt) is not None:
+                self.running.remove(tween)
+        self.apply_moves()
+        if not self.running:
+            self.finished.emit()
+
+    def apply_moves(self):
+        if not self.moves:
+            return
+        import numpy as np  # Not needed until the first animation, so it stays out of the start-up
+        start = np.array([move.start for move in self.moves])
+        end = np.array([move.end for move in self.moves])
+        progress = np.array([move.ease(move.elapsed / move.duration) for move in self.moves])
+        positions = start + (end - start) * progress[:, None]
+        for move, (x, y, angle) in zip(self.moves, positions.tolist()):
+            move.card.set_at(x, y, angle)
+        self.moves.clear()